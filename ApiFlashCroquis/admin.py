@@ -9,22 +9,35 @@ class ProjectSessionAdmin(admin.ModelAdmin):
     search_fields = ('title', 'session_id')
     readonly_fields = ('session_id', 'created_at', 'last_accessed')
     ordering = ('-created_at',)
+    show_full_result_count = False
 
 @admin.register(Layer)
 class LayerAdmin(admin.ModelAdmin):
     list_display = ('id', 'session', 'name', 'layer_type', 'geometry_type', 'feature_count', 'created_at')
+    list_select_related = ('session',)
     list_filter = ('layer_type', 'geometry_type', 'created_at', 'session')
     search_fields = ('name', 'id', 'session__title', 'session__session_id')
     readonly_fields = ('id', 'created_at')
     ordering = ('-created_at',)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # data_source n'est pas affiché dans la liste
+        return super().get_queryset(request).defer('data_source')
 
 @admin.register(GeneratedFile)
 class GeneratedFileAdmin(admin.ModelAdmin):
     list_display = ('id', 'session', 'file_type', 'file_path', 'created_at')
+    list_select_related = ('session',)
     list_filter = ('file_type', 'created_at', 'session')
     search_fields = ('file_path', 'id', 'session__title', 'session__session_id')
     readonly_fields = ('id', 'created_at')
     ordering = ('-created_at',)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # metadata (JSON) n'est pas affiché dans la liste
+        return super().get_queryset(request).defer('metadata')
 
 # Configuration de l'interface d'administration
 admin.site.site_header = "Flash Croquis Administration"
@@ -0,0 +1,14 @@
+# apps.py
+from django.apps import AppConfig
+
+
+class ApiFlashCroquisConfig(AppConfig):
+    name = 'ApiFlashCroquis'
+
+    def ready(self):
+        # Initialiser QGIS au démarrage du worker plutôt qu'à la première requête
+        from . import utils
+        from .qgis_utils import initialize_qgis_if_needed
+
+        success, _ = initialize_qgis_if_needed()
+        utils._QGIS_READY = success
@@ -4,15 +4,74 @@ Commande de gestion Django pour nettoyer les anciennes sessions
 Usage: python manage.py cleanup_old_sessions
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
-from ApiFlashCroquis.models import ProjectSession, GeneratedFile
+from ApiFlashCroquis.models import ProjectSession, Layer, GeneratedFile
+
+# Les suppressions de fichiers sont limitées par la latence (NFS, S3...) :
+# on les parallélise plutôt que d'enchaîner les allers-retours.
+STORAGE_DELETE_WORKERS = 32
+
+
+def _delete_generated_file(row):
+    """Supprimer les fichiers d'une ligne GeneratedFile; retourne (pk, erreur éventuelle)
+
+    file_path est un chemin absolu (comme dans GeneratedFile.delete_file), image_file
+    un nom relatif au stockage par défaut.
+    """
+    pk, file_path, image_file = row
+    try:
+        if file_path:
+            try:
+                os.unlink(file_path)
+            except (FileNotFoundError, IsADirectoryError):
+                pass
+        if image_file:
+            default_storage.delete(image_file)
+    except Exception as e:
+        return pk, e
+    return pk, None
+
+
+def _raw_delete(queryset):
+    """Supprimer en une requête, sans Collector ni signaux; retourne le nombre de lignes"""
+    return queryset._raw_delete(queryset.db)
 
 
 class Command(BaseCommand):
     help = 'Nettoie les sessions et fichiers anciens'
 
+    def _delete_generated_files(self, executor, queryset, chunk_size):
+        """Supprimer les fichiers puis les lignes GeneratedFile du queryset, par lots
+
+        Une ligne dont un fichier n'a pas pu être supprimé est conservée pour ne pas
+        laisser de fichier orphelin; le parcours par pk croissant évite de la relire.
+        """
+        deleted = 0
+        last_pk = None
+        queryset = queryset.order_by('pk')
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            rows = list(batch.values_list('pk', 'file_path', 'image_file')[:chunk_size])
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            removed = []
+            for pk, error in executor.map(_delete_generated_file, rows):
+                if error is None:
+                    removed.append(pk)
+                else:
+                    self.stdout.write(f"Erreur lors de la suppression des fichiers de {pk}: {error}")
+
+            if removed:
+                deleted += _raw_delete(GeneratedFile.objects.filter(pk__in=removed))
+        return deleted
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--days',
@@ -25,10 +84,17 @@ class Command(BaseCommand):
             action='store_true',
             help='Simulation sans suppression réelle'
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Nombre de lignes supprimées par lot (défaut: 10000)'
+        )
 
     def handle(self, *args, **options):
         days = options['days']
         dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
         cutoff_date = timezone.now() - timedelta(days=days)
 
         self.stdout.write(f"Recherche des sessions inactives depuis plus de {days} jours...")
@@ -38,34 +104,48 @@ class Command(BaseCommand):
             last_accessed__lt=cutoff_date,
             status='inactive'
         )
-        
-        sessions_count = old_sessions.count()
-        
+
         if dry_run:
+            sessions_count = old_sessions.count()
             self.stdout.write(f"[DRY RUN] {sessions_count} sessions seraient supprimées")
         else:
-            deleted_sessions, _ = old_sessions.delete()
+            deleted_sessions = 0
+            last_pk = None
+            old_sessions = old_sessions.order_by('pk')
+            with ThreadPoolExecutor(max_workers=STORAGE_DELETE_WORKERS) as executor:
+                while True:
+                    batch = old_sessions if last_pk is None else old_sessions.filter(pk__gt=last_pk)
+                    ids = list(batch.values_list('pk', flat=True)[:chunk_size])
+                    if not ids:
+                        break
+                    last_pk = ids[-1]
+                    # _raw_delete ne cascade pas : supprimer d'abord les lignes dépendantes,
+                    # et les fichiers générés avant leurs lignes
+                    self._delete_generated_files(
+                        executor, GeneratedFile.objects.filter(session__in=ids), chunk_size
+                    )
+                    # Garder les sessions dont un fichier généré n'a pas pu être supprimé
+                    kept = set(
+                        GeneratedFile.objects.filter(session__in=ids).values_list('session', flat=True)
+                    )
+                    ids = [pk for pk in ids if pk not in kept]
+                    if not ids:
+                        continue
+                    _raw_delete(Layer.objects.filter(session__in=ids))
+                    deleted_sessions += _raw_delete(ProjectSession.objects.filter(pk__in=ids))
             self.stdout.write(f"{deleted_sessions} sessions supprimées")
 
         # Nettoyer les fichiers générés anciens
         old_files = GeneratedFile.objects.filter(
             created_at__lt=cutoff_date
         )
-        
-        files_count = old_files.count()
-        
+
         if dry_run:
+            files_count = old_files.count()
             self.stdout.write(f"[DRY RUN] {files_count} fichiers générés seraient supprimés")
         else:
-            # Supprimer les fichiers du système de fichiers
-            for file_obj in old_files:
-                try:
-                    if file_obj.file_path and file_obj.file_path.storage.exists(file_obj.file_path.name):
-                        file_obj.file_path.delete()
-                except Exception as e:
-                    self.stdout.write(f"Erreur lors de la suppression du fichier {file_obj.filename}: {e}")
-            
-            deleted_files, _ = old_files.delete()
+            with ThreadPoolExecutor(max_workers=STORAGE_DELETE_WORKERS) as executor:
+                deleted_files = self._delete_generated_files(executor, old_files, chunk_size)
             self.stdout.write(f"{deleted_files} fichiers générés supprimés")
 
         # Nettoyer les fichiers temporaires
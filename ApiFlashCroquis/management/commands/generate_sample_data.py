@@ -6,8 +6,13 @@ Usage: python manage.py generate_sample_data
 
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
-from flashcroquis.models import ProjectSession, Layer, Parcelle, PointSommet
-import uuid
+from django.db import transaction
+from ApiFlashCroquis.models import ProjectSession, Layer
+
+# PostgreSQL limite une requête à 65535 paramètres
+PG_MAX_QUERY_PARAMS = 65535
+# Une couche de test par type de géométrie et par session
+SAMPLE_GEOMETRY_TYPES = ('polygon', 'point')
 
 
 class Command(BaseCommand):
@@ -21,6 +26,7 @@ class Command(BaseCommand):
             help='Nombre d\'éléments à créer (défaut: 5)'
         )
 
+    @transaction.atomic
     def handle(self, *args, **options):
         count = options['count']
         
@@ -39,56 +45,51 @@ class Command(BaseCommand):
             user.save()
             self.stdout.write(f"Utilisateur de test créé: {user.username}")
 
-        # Créer des sessions de projet
-        for i in range(count):
-            session = ProjectSession.objects.create(
-                title=f'Projet Test {i+1}',
-                user=user,
-                crs='EPSG:4326',
-                status='active'
-            )
+        # Préparer les objets en mémoire (les UUID sont générés côté Python,
+        # les clés étrangères sont donc résolues avant l'INSERT)
+        # Le titre de session sert de clé de déduplication : une relance ne
+        # recrée pas les éléments déjà générés
+        titles = [f'Projet Test {i+1}' for i in range(count)]
+        existing_titles = set(
+            ProjectSession.objects.filter(title__in=titles).values_list('title', flat=True)
+        )
+        
+        sessions, layers = [], []
+        for i, title in enumerate(titles):
+            if title in existing_titles:
+                continue
             
-            # Créer des couches pour chaque session
-            layer = Layer.objects.create(
-                session=session,
-                qgis_layer_id=f'layer_{uuid.uuid4()}',
-                name=f'Couche Test {i+1}',
-                layer_type='vector',
-                geometry_type='polygon',
+            session = ProjectSession(
+                title=title,
                 crs='EPSG:4326',
-                feature_count=10 + i,
-                is_visible=True
-            )
-            
-            # Créer une parcelle pour chaque couche
-            parcelle = Parcelle.objects.create(
-                id=f'PARC{i+1:04d}',
-                session=session,
-                layer=layer,
-                nom=f'Parcelle Test {i+1}',
-                superficie=1000.0 + i * 100,
-                proprietaire=f'Propriétaire {i+1}',
-                localisation=f'Zone {chr(65+i)}',
                 status='active'
             )
+            sessions.append(session)
             
-            # Créer des points sommets pour chaque parcelle
-            for j in range(4):  # 4 points pour faire un rectangle
-                PointSommet.objects.create(
-                    parcelle=parcelle,
-                    nom_borne=f'B{j+1}',
-                    x=10.0 + i + j * 0.001,
-                    y=12.0 + i + j * 0.001,
-                    ordre=j,
-                    distance=50.0 + j * 10
-                )
+            # Créer des couches pour chaque session
+            for j, geometry_type in enumerate(SAMPLE_GEOMETRY_TYPES):
+                layers.append(Layer(
+                    session=session,
+                    name=f'Couche Test {i+1}.{j+1}',
+                    layer_type='vector',
+                    geometry_type=geometry_type,
+                    data_source=f'/tmp/flashcroquis_sample/layer_{i+1}_{j+1}.geojson',
+                    feature_count=10 + i
+                ))
+
+        # Insertion par lots : une requête INSERT multi-lignes par lot, aussi
+        # grande que la limite de paramètres le permet
+        ProjectSession.objects.bulk_create(
+            sessions, batch_size=PG_MAX_QUERY_PARAMS // len(ProjectSession._meta.concrete_fields)
+        )
+        Layer.objects.bulk_create(
+            layers, batch_size=PG_MAX_QUERY_PARAMS // len(Layer._meta.concrete_fields)
+        )
 
         self.stdout.write(
             self.style.SUCCESS(
                 f'Données de test générées avec succès:\n'
-                f'- {count} sessions de projet\n'
-                f'- {count} couches\n'
-                f'- {count} parcelles\n'
-                f'- {count * 4} points sommets'
+                f'- {len(sessions)} sessions de projet\n'
+                f'- {len(layers)} couches'
             )
         )
@@ -5,7 +5,7 @@ Usage: python manage.py initialize_qgis
 """
 
 from django.core.management.base import BaseCommand
-from ApiFlashCroquis.qgis_utils import initialize_qgis_if_needed, get_qgis_manager
+from ApiFlashCroquis.qgis_utils import initialize_qgis_if_needed, get_qgis_manager, get_qgis_classes
 
 
 class Command(BaseCommand):
@@ -17,18 +17,17 @@ class Command(BaseCommand):
         success, error = initialize_qgis_if_needed()
         
         if success:
-            manager = get_qgis_manager()
-            classes = manager.get_classes()
+            classes = get_qgis_classes()
             
             self.stdout.write(self.style.SUCCESS("QGIS initialisé avec succès"))
             self.stdout.write(f"Classes QGIS disponibles: {len(classes)}")
             
             # Afficher quelques informations sur QGIS
-            try:
-                qgis_version = classes['Qgis'].QGIS_VERSION
-                self.stdout.write(f"Version QGIS: {qgis_version}")
-            except Exception as e:
-                self.stdout.write(f"Impossible de récupérer la version QGIS: {e}")
+            Qgis = getattr(classes, 'Qgis', None)
+            if Qgis is not None:
+                self.stdout.write(f"Version QGIS: {Qgis.QGIS_VERSION}")
+            else:
+                self.stdout.write("Impossible de récupérer la version QGIS")
                 
         else:
             self.stdout.write(self.style.ERROR(f"Erreur d'initialisation QGIS: {error}"))
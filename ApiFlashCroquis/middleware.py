@@ -0,0 +1,31 @@
+# middleware.py - Middlewares FlashCroquis
+import logging
+from django.http import JsonResponse
+from .utils import get_flashcroquis_setting, standard_response_data
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSizeLimitMiddleware:
+    """Refuser les requêtes dont le Content-Length dépasse MAX_UPLOAD_SIZE avant de lire le corps"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Lu à chaque requête (mémoïsé) pour suivre override_settings comme SizeLimitedUploadHandler
+        max_size = get_flashcroquis_setting('MAX_UPLOAD_SIZE')
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+
+        if content_length > max_size:
+            logger.warning("Upload refusé: %s octets (max %s)", content_length, max_size)
+            return JsonResponse(standard_response_data(
+                success=False,
+                error="Request entity too large",
+                message=f"Le fichier est trop volumineux. Taille maximale autorisée: {max_size / (1024*1024):.2f} Mo."
+            ), status=413)
+
+        return self.get_response(request)
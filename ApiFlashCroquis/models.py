@@ -6,11 +6,23 @@ from django.core.files.storage import default_storage
 
 class ProjectSession(models.Model):
     """Modèle pour gérer une session de projet persistante"""
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('inactive', 'Inactive'),
+    ]
+    
     session_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255, default='Nouveau Projet')
     crs = models.CharField(max_length=50, default='EPSG:4326')
     created_at = models.DateTimeField(auto_now_add=True)
     last_accessed = models.DateTimeField(auto_now=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['status', 'last_accessed']),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.session_id})"
@@ -38,6 +50,12 @@ class Layer(models.Model):
     feature_count = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['session', 'created_at']),
+        ]
+    
     def __str__(self):
         return f"{self.name} ({self.layer_type})"
 
@@ -64,8 +82,10 @@ class GeneratedFile(models.Model):
     
     def delete_file(self):
         """Supprime le fichier physique"""
-        if os.path.exists(self.file_path):
-            os.remove(self.file_path)
+        try:
+            os.unlink(self.file_path)
+        except (FileNotFoundError, IsADirectoryError):
+            pass
     
     def __str__(self):
         return f"{self.file_type} - {self.created_at}"
@@ -95,6 +115,11 @@ class GeneratedFile(models.Model):
     class Meta:
         db_table = 'map_renders'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['session', 'file_type']),
+            models.Index(fields=['session', 'created_at']),
+        ]
     
     def __str__(self):
         return f"Render {self.id} - {self.width}x{self.height}"
\ No newline at end of file
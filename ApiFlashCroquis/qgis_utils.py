@@ -0,0 +1,316 @@
+# qgis_utils.py - Gestion de l'environnement QGIS et des sessions de projet
+import heapq
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
+from types import SimpleNamespace
+from .utils import get_flashcroquis_setting
+
+# Configuration du logger
+logger = logging.getLogger(__name__)
+
+# Extensions SIMD utilisées par Qt : nom Qt -> drapeau de /proc/cpuinfo
+QT_CPU_FEATURES = (
+    ('sse4.1', 'sse4_1'),
+    ('sse4.2', 'sse4_2'),
+    ('avx', 'avx'),
+    ('avx2', 'avx2'),
+)
+
+def _missing_cpu_features():
+    """Extensions SIMD non supportées par le processeur (vide si indétectable)"""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    flags = set(line.split(':', 1)[1].split())
+                    break
+            else:
+                return []
+    except OSError:
+        return []
+    return [qt_name for qt_name, flag in QT_CPU_FEATURES if flag not in flags]
+
+class QGISClasses(SimpleNamespace):
+    """Classes QGIS accessibles par attribut (classes.QgsProject); classes['QgsProject'] reste supporté"""
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __len__(self):
+        return len(self.__dict__)
+
+# Gestionnaire QGIS
+class QGISManager:
+    __slots__ = (
+        '_initialized', '_initialization_attempted', '_init_lock',
+        'qgs_app', 'classes', 'init_errors',
+    )
+
+    def __init__(self):
+        self._initialized = False
+        self._initialization_attempted = False
+        self._init_lock = threading.Lock()
+        self.qgs_app = None
+        self.classes = QGISClasses()
+        self.init_errors = []
+        
+    def initialize(self):
+        if self._initialized:
+            return True, None
+            
+        # initQgis() n'est pas réentrant : une seule initialisation à la fois
+        with self._init_lock:
+            if self._initialized:
+                return True, None
+
+            if self._initialization_attempted:
+                return False, self.init_errors
+            
+            self._initialization_attempted = True
+            try:
+                # Configuration de l'environnement QGIS
+                self._setup_qgis_environment()
+            
+                # Importation des classes QGIS
+                from qgis.PyQt.QtCore import Qt
+                from qgis.core import (
+                    Qgis, QgsApplication, QgsProject, QgsVectorLayer, QgsRasterLayer,
+                    QgsMapSettings, QgsMapRendererParallelJob, QgsRectangle,
+                    QgsProcessingFeedback, QgsProcessingContext, QgsPalLayerSettings,
+                    QgsTextFormat, QgsVectorLayerSimpleLabeling, QgsPrintLayout,
+                    QgsLayoutItemMap, QgsLayoutItemLegend, QgsLayerTreeModel,
+                    QgsLayerTreeLayer, QgsLayerTreeGroup, QgsSingleSymbolRenderer,
+                    QgsFillSymbol, QgsLineSymbol, QgsMarkerSymbol, QgsGeometry,
+                    QgsFeature, QgsField, QgsVectorFileWriter, QgsWkbTypes, QgsLayoutExporter,
+                    QgsLayoutItemScaleBar, QgsLayoutItemPicture, QgsLayoutItemPage,
+                    QgsLayoutTable, QgsLayoutItemAttributeTable, QgsUnitTypes, QgsLayoutPoint, QgsLayoutPoint,
+                    QgsLayoutSize, QgsLayoutItemLabel, QgsFeatureRequest
+                )
+                from PyQt5.QtCore import QVariant, QSize, QBuffer, QByteArray, QIODevice
+                from PyQt5.QtGui import QImage, QPainter, QPen, QBrush, QFont, QColor
+                from PyQt5.QtXml import QDomDocument
+            
+                # Initialisation de l'application QGIS
+                self.qgs_app = QgsApplication([], False)
+                self.qgs_app.initQgis()
+            
+                # Stockage des classes
+                self.classes = QGISClasses(
+                    Qgis=Qgis,
+                    QgsApplication=QgsApplication,
+                    QgsProject=QgsProject,
+                    QgsVectorLayer=QgsVectorLayer,
+                    QgsRasterLayer=QgsRasterLayer,
+                    QgsMapSettings=QgsMapSettings,
+                    QgsMapRendererParallelJob=QgsMapRendererParallelJob,
+                    QgsRectangle=QgsRectangle,
+                    QgsProcessingFeedback=QgsProcessingFeedback,
+                    QgsProcessingContext=QgsProcessingContext,
+                    QgsPalLayerSettings=QgsPalLayerSettings,
+                    QgsTextFormat=QgsTextFormat,
+                    QgsVectorLayerSimpleLabeling=QgsVectorLayerSimpleLabeling,
+                    QgsPrintLayout=QgsPrintLayout,
+                    QgsLayoutItemMap=QgsLayoutItemMap,
+                    QgsLayoutItemLegend=QgsLayoutItemLegend,
+                    QgsLayerTreeModel=QgsLayerTreeModel,
+                    QgsLayerTreeLayer=QgsLayerTreeLayer,
+                    QgsLayerTreeGroup=QgsLayerTreeGroup,
+                    QgsSingleSymbolRenderer=QgsSingleSymbolRenderer,
+                    QgsFillSymbol=QgsFillSymbol,
+                    QgsLineSymbol=QgsLineSymbol,
+                    QgsMarkerSymbol=QgsMarkerSymbol,
+                    QgsGeometry=QgsGeometry,
+                    QgsFeature=QgsFeature,
+                    QgsFeatureRequest=QgsFeatureRequest,
+                    QgsField=QgsField,
+                    QgsVectorFileWriter=QgsVectorFileWriter,
+                    QgsWkbTypes=QgsWkbTypes,
+                    QVariant=QVariant,
+                    QSize=QSize,
+                    QBuffer=QBuffer,
+                    QByteArray=QByteArray,
+                    QIODevice=QIODevice,
+                    QImage=QImage,
+                    QPainter=QPainter,
+                    QPen=QPen,
+                    QBrush=QBrush,
+                    QFont=QFont,
+                    QColor=QColor,
+                    QDomDocument=QDomDocument,
+                    QgsLayoutExporter=QgsLayoutExporter,
+                    QgsLayoutItemScaleBar=QgsLayoutItemScaleBar,
+                    QgsLayoutItemPicture=QgsLayoutItemPicture,
+                    QgsLayoutItemPage=QgsLayoutItemPage,
+                    QgsLayoutTable=QgsLayoutTable,
+                    QgsLayoutItemAttributeTable=QgsLayoutItemAttributeTable,
+                    QgsUnitTypes=QgsUnitTypes,
+                    QgsLayoutPoint=QgsLayoutPoint,
+                    QgsLayoutSize=QgsLayoutSize,
+                    QgsLayoutFrame=QgsLayoutPoint,
+                    Qt=Qt,
+                    QgsLayoutItemLabel=QgsLayoutItemLabel
+                )
+            
+                self._initialized = True
+                logger.info("Environnement QGIS configuré")
+                return True, None
+            
+            except Exception as e:
+                error_msg = f"Erreur d'initialisation QGIS: {str(e)}"
+                self.init_errors.append(error_msg)
+                logger.error(error_msg)
+                return False, self.init_errors
+
+    def _setup_qgis_environment(self):
+        """Configurer l'environnement QGIS"""
+        os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+        os.environ['QT_DEBUG_PLUGINS'] = '0'
+        os.environ['QT_QPA_FONTDIR'] = os.path.join(os.path.dirname(__file__), 'ttf')
+        # Ne désactiver que les extensions SIMD absentes de l'hôte (une valeur
+        # déjà définie dans l'environnement reste prioritaire)
+        if 'QT_NO_CPU_FEATURE' not in os.environ:
+            missing = _missing_cpu_features()
+            if missing:
+                os.environ['QT_NO_CPU_FEATURE'] = ','.join(missing)
+        logger.info("Environnement QGIS configuré")
+
+    def is_initialized(self):
+        return self._initialized
+        
+    def get_classes(self):
+        if not self._initialized:
+            raise Exception("QGIS not initialized")
+        return self.classes
+        
+    def get_errors(self):
+        return self.init_errors
+
+# Singleton pour le gestionnaire QGIS
+_qgis_manager = None
+_qgis_manager_lock = threading.Lock()
+
+def get_qgis_manager():
+    global _qgis_manager
+    manager = _qgis_manager
+    if manager is None:
+        with _qgis_manager_lock:
+            if _qgis_manager is None:
+                _qgis_manager = QGISManager()
+            manager = _qgis_manager
+    return manager
+
+def initialize_qgis_if_needed():
+    manager = get_qgis_manager()
+    if not manager.is_initialized():
+        return manager.initialize()
+    return True, None
+
+@lru_cache(maxsize=1)
+def get_qgis_classes():
+    """Classes QGIS mémoïsées (lève une exception tant que QGIS n'est pas initialisé)"""
+    return get_qgis_manager().get_classes()
+
+# Gestion des sessions de projet
+# Version du contenu du projet QGIS, partagé par toutes les sessions (QgsProject.instance()):
+# incrémentée à chaque ajout/suppression de couche pour invalider les rendus en cache
+_project_version = 0
+_project_version_lock = threading.Lock()
+
+def get_project_version():
+    return _project_version
+
+def bump_project_version():
+    global _project_version
+    with _project_version_lock:
+        _project_version += 1
+
+project_sessions = {}  # borné par _evict_sessions_locked
+project_sessions_lock = threading.Lock()  # ne protège que la création de sessions
+
+class ProjectSessionManager:
+    # Une instance par session active : pas de __dict__ par instance
+    __slots__ = (
+        'session_id', 'project', 'created_at', 'last_accessed',
+        'temporary_files', '_lock',
+    )
+
+    def __init__(self, session_id=None):
+        self.session_id = session_id or str(uuid.uuid4())
+        self.project = None
+        self.created_at = datetime.now()
+        self.last_accessed = datetime.now()
+        self.temporary_files = []
+        # Verrou propre à la session pour project / temporary_files
+        self._lock = threading.RLock()
+        
+    def get_project(self):
+        if self.project is None:
+            with self._lock:
+                if self.project is None:
+                    self.project = get_qgis_classes().QgsProject.instance()
+        return self.project
+
+    def cleanup(self):
+        """Supprimer les fichiers temporaires de la session"""
+        with self._lock:
+            # Vider la liste d'abord : un échec partiel ne rejoue pas toute la liste
+            files, self.temporary_files = self.temporary_files, []
+        for path in files:
+            # unlink direct : un seul appel système, pas de course exists()/remove()
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Impossible de supprimer le fichier temporaire {path}: {e}")
+
+def _evict_sessions_locked():
+    """Retirer les sessions inactives depuis PROJECT_SESSION_TIMEOUT, puis les moins
+    récemment utilisées au-delà de MAX_PROJECT_SESSIONS (appelé verrou tenu).
+    Retourne les sessions retirées, à nettoyer hors verrou."""
+    cutoff = datetime.now() - timedelta(seconds=get_flashcroquis_setting('PROJECT_SESSION_TIMEOUT', 86400))
+    max_sessions = get_flashcroquis_setting('MAX_PROJECT_SESSIONS', 256)
+
+    evicted = [sid for sid, session in project_sessions.items() if session.last_accessed < cutoff]
+    overflow = len(project_sessions) - len(evicted) + 1 - max_sessions
+    if overflow > 0:
+        expired = set(evicted)
+        remaining = ((sid, session) for sid, session in project_sessions.items() if sid not in expired)
+        evicted.extend(sid for sid, _ in heapq.nsmallest(overflow, remaining, key=lambda item: item[1].last_accessed))
+
+    return [project_sessions.pop(sid) for sid in evicted]
+
+def get_project_session(session_id=None):
+    """Obtenir ou créer une session de projet"""
+    # Chemin rapide sans verrou : dict.get est atomique sous le GIL
+    if session_id:
+        session = project_sessions.get(session_id)
+        if session is not None:
+            session.last_accessed = datetime.now()
+            return session, session_id
+
+    with project_sessions_lock:
+        # Revérifier : une autre requête a pu créer la session entre-temps
+        if session_id:
+            session = project_sessions.get(session_id)
+            if session is not None:
+                session.last_accessed = datetime.now()
+                return session, session_id
+        # Borner le registre avant d'y ajouter une session
+        evicted = _evict_sessions_locked()
+        session = ProjectSessionManager(session_id)
+        if not session_id:
+            session_id = session.session_id
+        project_sessions[session_id] = session
+
+    # Les suppressions de fichiers se font hors verrou. Le QgsProject n'est pas
+    # vidé : QgsProject.instance() est partagé par toutes les sessions.
+    for old_session in evicted:
+        old_session.cleanup()
+    if evicted:
+        logger.info(f"{len(evicted)} session(s) QGIS retirée(s) du registre")
+    return session, session_id
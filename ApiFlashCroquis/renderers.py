@@ -0,0 +1,27 @@
+# renderers.py - Renderers DRF FlashCroquis
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Sérialisation JSON via orjson (extension C), beaucoup plus rapide sur les grosses listes d'entités
+
+    Différence avec JSONRenderer: NaN et ±Infinity sont écrits `null` au lieu de lever
+    une ValueError (STRICT_JSON), ce qui garde la réponse valide pour les attributs
+    numériques non finis des couches.
+    """
+
+    # Types non gérés nativement par orjson (Decimal, lazy strings, QuerySet...) délégués à l'encodeur DRF
+    _fallback_default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        # Sortie indentée (API navigable, ?indent=) : garder le rendu standard
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Clés non-str (int, UUID...) converties comme le fait json.dumps
+        return orjson.dumps(data, default=self._fallback_default, option=orjson.OPT_NON_STR_KEYS)
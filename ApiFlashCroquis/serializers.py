@@ -1,5 +1,6 @@
 # serializers.py
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
 from .models import ProjectSession, Layer, GeneratedFile
 
@@ -22,15 +23,12 @@ class LayerSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 class GeneratedFileSerializer(serializers.ModelSerializer):
-    file_url = serializers.SerializerMethodField()
+    file_url = serializers.CharField(source='get_file_url', read_only=True)
     
     class Meta:
         model = GeneratedFile
         fields = ['id', 'session', 'file_type', 'file_path', 'file_url', 'created_at', 'metadata']
         read_only_fields = ['id', 'file_url', 'created_at']
-    
-    def get_file_url(self, obj):
-        return obj.get_file_url()
 
 class RenderMapSerializer(serializers.Serializer):
     session_id = serializers.UUIDField(required=True)
@@ -110,8 +108,8 @@ class FileUploadSerializer(serializers.Serializer):
         Validation personnalisée pour le fichier.
         Vous pouvez ajouter des vérifications de taille, d'extension, etc.
         """
-        # Exemple: Limiter la taille du fichier à 100 Mo
-        max_size = 100 * 1024 * 1024  # 100 Mo en octets
+        # Limiter la taille du fichier (le middleware refuse déjà les corps trop gros)
+        max_size = settings.FLASHCROQUIS_SETTINGS['MAX_UPLOAD_SIZE']
         if value.size > max_size:
             raise serializers.ValidationError(f"Le fichier est trop volumineux. Taille maximale autorisée: {max_size / (1024*1024):.2f} Mo.")
         
@@ -35,6 +35,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'ApiFlashCroquis.middleware.UploadSizeLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -73,6 +74,9 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', ''),
         'HOST': os.environ.get('DB_HOST', ''),
         'PORT': os.environ.get('DB_PORT', ''),
+        # Connexions persistantes, vérifiées au début de chaque requête
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'charset': 'utf8mb4',
         } if os.environ.get('DB_ENGINE') == 'django.db.backends.mysql' else {},
@@ -116,6 +120,13 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework Configuration
+# orjson est optionnel: renderer JSON standard de DRF s'il n'est pas installé
+try:
+    import orjson  # noqa: F401
+    JSON_RENDERER_CLASS = 'ApiFlashCroquis.renderers.ORJSONRenderer'
+except ImportError:
+    JSON_RENDERER_CLASS = 'rest_framework.renderers.JSONRenderer'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
@@ -134,7 +145,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        JSON_RENDERER_CLASS,
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'EXCEPTION_HANDLER': 'ApiFlashCroquis.utils.custom_exception_handler',
@@ -144,6 +155,9 @@ REST_FRAMEWORK = {
 }
 
 # Swagger/OpenAPI Configuration
+# Documentation API (swagger/redoc) : désactivée par défaut hors DEBUG
+ENABLE_API_DOCS = os.environ.get('ENABLE_API_DOCS', str(DEBUG)).lower() in ('true', '1', 'yes')
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -257,6 +271,12 @@ os.makedirs(BASE_DIR / 'logs', exist_ok=True)
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 FILE_UPLOAD_PERMISSIONS = 0o644
+# Les petits fichiers (<= FILE_UPLOAD_MAX_MEMORY_SIZE) restent en mémoire; les autres
+# sont écrits sur disque et l'upload est interrompu dès que MAX_UPLOAD_SIZE est dépassé
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'ApiFlashCroquis.utils.SizeLimitedUploadHandler',
+]
 
 # Security Settings
 SECURE_BROWSER_XSS_FILTER = True
@@ -310,9 +330,11 @@ FLASHCROQUIS_SETTINGS = {
     
     # File Processing
     'MAX_LAYER_FILE_SIZE': 50 * 1024 * 1024,  # 50MB
-    'ALLOWED_VECTOR_FORMATS': ['.shp', '.geojson', '.kml', '.gpx', '.csv'],
-    'ALLOWED_RASTER_FORMATS': ['.tif', '.tiff', '.geotiff', '.jpg', '.png'],
+    'MAX_UPLOAD_SIZE': 100 * 1024 * 1024,  # 100MB
+    'ALLOWED_VECTOR_FORMATS': frozenset({'.shp', '.geojson', '.kml', '.gpx', '.csv'}),
+    'ALLOWED_RASTER_FORMATS': frozenset({'.tif', '.tiff', '.geotiff', '.jpg', '.png'}),
     'TEMP_FILE_RETENTION_DAYS': 7,
+    'TEMP_CLEANUP_WORKERS': 8,  # 2 suffisent sur disque mécanique
     
     # Map Rendering
     'DEFAULT_MAP_WIDTH': 800,
@@ -321,6 +343,9 @@ FLASHCROQUIS_SETTINGS = {
     'MAX_MAP_HEIGHT': 5000,
     'DEFAULT_DPI': 96,
     'MAX_DPI': 300,
+    'RENDER_CACHE_SIZE': 64,  # rendus de carte encodés gardés en mémoire par worker (0 = désactivé)
+    'RENDER_CACHE_MAX_BYTES': 64 * 1024 * 1024,  # taille totale du cache de rendus par worker
+    'RENDER_CACHE_MAX_ENTRY_BYTES': 4 * 1024 * 1024,  # rendus plus gros jamais mis en cache
     
     # PDF Generation
     'DEFAULT_PDF_QUALITY': 90,
@@ -329,6 +354,7 @@ FLASHCROQUIS_SETTINGS = {
     
     # Session Management
     'PROJECT_SESSION_TIMEOUT': 86400,  # 24 hours
+    'MAX_PROJECT_SESSIONS': 256,  # sessions QGIS gardées en mémoire par worker
     'MAX_SESSIONS_PER_USER': 10,
     'CLEANUP_INTERVAL': 3600,  # 1 hour
     
@@ -337,6 +363,9 @@ FLASHCROQUIS_SETTINGS = {
     'BULK_OPERATION_LIMIT': 100,
     'CONCURRENT_PROCESSING_LIMIT': 5,
     
+    # Health Check
+    'HEALTH_CACHE_TTL': 5,  # secondes pendant lesquelles un résultat est réutilisé
+    
     # Geographic Settings
     'DEFAULT_CRS': 'EPSG:4326',
     'SUPPORTED_CRS': [
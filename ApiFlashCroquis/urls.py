@@ -5,35 +5,14 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 from .views import ProjectSessionViewSet, LayerViewSet, MapViewSet, FileViewSet
 
-# Configuration Swagger
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Flash Croquis API",
-        default_version='v1',
-        description="API QGIS pour la gestion de projets cartographiques et génération de documents",
-        contact=openapi.Contact(email="contact@flashcroquis.com"),
-        license=openapi.License(name="Licence propriétaire"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-    url="https://jubilant-fiesta-q6775vvwq9jh4wvg-8000.app.github.dev", 
-)
-
 router = DefaultRouter()
 router.register(r'sessions', ProjectSessionViewSet, basename='session')
 router.register(r'layers', LayerViewSet, basename='layer')
 router.register(r'files', FileViewSet, basename='file') 
 
 urlpatterns = [
-    # Documentation API
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    path('swagger.json', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-
     path('api/', include(router.urls)),
     path('api/map/', include([
         path('render/', MapViewSet.as_view({'post': 'render_map'}), name='render-map'),
@@ -49,5 +28,50 @@ urlpatterns = [
     path('admin/', admin.site.urls),
 ]
 
+# Documentation API : le générateur drf-yasg n'est construit que si elle est activée
+if settings.ENABLE_API_DOCS:
+    import hashlib
+    from functools import lru_cache
+    from django.views.decorators.http import etag
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.views import get_schema_view
+    from drf_yasg import openapi
+
+    api_info = openapi.Info(
+        title="Flash Croquis API",
+        default_version='v1',
+        description="API QGIS pour la gestion de projets cartographiques et génération de documents",
+        contact=openapi.Contact(email="contact@flashcroquis.com"),
+        license=openapi.License(name="Licence propriétaire"),
+    )
+    api_url = "https://jubilant-fiesta-q6775vvwq9jh4wvg-8000.app.github.dev"
+
+    schema_view = get_schema_view(
+        api_info,
+        public=True,
+        permission_classes=[permissions.AllowAny],
+        url=api_url,
+    )
+
+    @lru_cache(maxsize=1)
+    def schema_etag():
+        """Empreinte du schéma OpenAPI public, calculée une fois par worker"""
+        generator = schema_view.generator_class(api_info, url=api_url)
+        schema = generator.get_schema(request=None, public=True)
+        return hashlib.md5(OpenAPICodecJson(validators=[]).encode(schema)).hexdigest()
+
+    # Le schéma OpenAPI ne change qu'au déploiement : le mettre en cache
+    SCHEMA_CACHE_TIMEOUT = 60 * 60
+    SCHEMA_CACHE_KWARGS = {'key_prefix': 'flashcroquis-swagger'}
+
+    urlpatterns += [
+        path('swagger/', schema_view.with_ui('swagger', cache_timeout=SCHEMA_CACHE_TIMEOUT, cache_kwargs=SCHEMA_CACHE_KWARGS), name='schema-swagger-ui'),
+        path('redoc/', schema_view.with_ui('redoc', cache_timeout=SCHEMA_CACHE_TIMEOUT, cache_kwargs=SCHEMA_CACHE_KWARGS), name='schema-redoc'),
+        # ETag : les clients qui repassent If-None-Match reçoivent un 304 sans régénération
+        path('swagger.json', etag(lambda request, *args, **kwargs: schema_etag())(
+            schema_view.without_ui(cache_timeout=SCHEMA_CACHE_TIMEOUT, cache_kwargs=SCHEMA_CACHE_KWARGS)
+        ), name='schema-json'),
+    ]
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,14 +1,63 @@
 # utils.py - Utilitaires généraux pour FlashCroquis
 import os
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.dispatch import receiver
+from django.core.signals import setting_changed
 from django.http import JsonResponse
 from rest_framework.views import exception_handler
 from rest_framework import status
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
+# Positionné par ApiFlashCroquisConfig.ready() une fois QGIS initialisé
+_QGIS_READY = False
+
+
+@lru_cache(maxsize=None)
+def get_flashcroquis_setting(name, default=_MISSING):
+    """Lire une valeur de FLASHCROQUIS_SETTINGS, mémoïsée (sans passer par LazySettings à chaque appel)"""
+    if default is _MISSING:
+        return settings.FLASHCROQUIS_SETTINGS[name]
+    return settings.FLASHCROQUIS_SETTINGS.get(name, default)
+
+
+@receiver(setting_changed)
+def _clear_flashcroquis_settings_cache(setting, **kwargs):
+    """Invalider le cache quand FLASHCROQUIS_SETTINGS est modifié (override_settings)"""
+    if setting == 'FLASHCROQUIS_SETTINGS':
+        get_flashcroquis_setting.cache_clear()
+
+
+# Nombre de fichiers supprimés par tâche du pool de nettoyage
+TEMP_CLEANUP_BATCH_SIZE = 64
+
+
+def standard_response_data(success, data=None, message=None, error=None, metadata=None, timestamp=None):
+    """Corps de réponse standard de l'API (vues DRF et middlewares)
+
+    timestamp permet de réutiliser une date déjà calculée dans la requête.
+    """
+    if timestamp is None:
+        timestamp = datetime.now()
+    return {
+        'success': success,
+        'timestamp': timestamp.isoformat(timespec='seconds'),
+        'data': data,
+        'message': message,
+        'error': error,
+        'metadata': metadata or {}
+    }
+
 
 def custom_exception_handler(exc, context):
     """Gestionnaire d'exceptions personnalisé pour l'API"""
@@ -19,7 +68,7 @@ def custom_exception_handler(exc, context):
         # Formater la réponse d'erreur selon notre standard
         custom_response_data = {
             'success': False,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
             'error': {
                 'type': exc.__class__.__name__,
                 'message': str(exc),
@@ -29,50 +78,82 @@ def custom_exception_handler(exc, context):
         }
         
         # Log de l'erreur
-        logger.error(f"API Error: {exc.__class__.__name__}: {str(exc)}")
+        logger.error("API Error: %s: %s", exc.__class__.__name__, exc)
         
         response.data = custom_response_data
 
     return response
 
 
-def cleanup_temp_files():
-    """Nettoyer les fichiers temporaires anciens"""
-    temp_dir = settings.FLASHCROQUIS_SETTINGS['QGIS_TEMP_DIR']
-    retention_days = settings.FLASHCROQUIS_SETTINGS['TEMP_FILE_RETENTION_DAYS']
-    cutoff_date = datetime.now() - timedelta(days=retention_days)
-    
-    cleaned_count = 0
-    
+def _iter_expired_files(path, cutoff_ts):
+    """Parcourir récursivement path avec os.scandir et produire les fichiers plus anciens que cutoff_ts"""
     try:
-        for root, dirs, files in os.walk(temp_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
+        with os.scandir(path) as it:
+            for entry in it:
                 try:
-                    file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
-                    if file_mtime < cutoff_date:
-                        os.remove(file_path)
-                        cleaned_count += 1
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from _iter_expired_files(entry.path, cutoff_ts)
+                    elif entry.stat(follow_symlinks=False).st_mtime < cutoff_ts:
+                        yield entry.path
                 except OSError:
                     continue
-                    
-        logger.info(f"Cleaned up {cleaned_count} temporary files")
+    except OSError:
+        return
+
+
+def _unlink_quietly(path):
+    """Supprimer un fichier, retourne True en cas de succès"""
+    try:
+        os.unlink(path)
+    except OSError:
+        return False
+    return True
+
+
+def _unlink_batch(paths):
+    """Supprimer un lot de fichiers, retourne le nombre de suppressions réussies"""
+    return sum(_unlink_quietly(path) for path in paths)
+
+
+def cleanup_temp_files():
+    """Nettoyer les fichiers temporaires anciens"""
+    temp_dir = get_flashcroquis_setting('QGIS_TEMP_DIR')
+    retention_days = get_flashcroquis_setting('TEMP_FILE_RETENTION_DAYS')
+    workers = get_flashcroquis_setting('TEMP_CLEANUP_WORKERS', 8)
+    cutoff_ts = (datetime.now() - timedelta(days=retention_days)).timestamp()
+
+    try:
+        # scandir fournit le stat avec l'entrée; les unlink sont parallélisés
+        # pour masquer la latence des systèmes de fichiers réseau
+        expired = list(_iter_expired_files(temp_dir, cutoff_ts))
+        batches = [expired[i:i + TEMP_CLEANUP_BATCH_SIZE] for i in range(0, len(expired), TEMP_CLEANUP_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            cleaned_count = sum(executor.map(_unlink_batch, batches))
+
+        logger.info("Cleaned up %d temporary files", cleaned_count)
         return cleaned_count
-        
+
     except Exception as e:
-        logger.error(f"Error during temp file cleanup: {e}")
+        logger.error("Error during temp file cleanup: %s", e)
         return 0
 
 
+@lru_cache(maxsize=32)
+def _lowercase_extensions(extensions):
+    """Extensions autorisées en minuscules, calculées une fois par ensemble"""
+    return frozenset(ext.lower() for ext in extensions)
+
+
 def validate_file_upload(uploaded_file, allowed_extensions=None, max_size=None):
     """Valider un fichier uploadé"""
     errors = []
     
-    # Vérifier l'extension
+    # Vérifier l'extension (frozenset en minuscules : test d'appartenance en O(1))
     if allowed_extensions:
+        allowed_extensions = _lowercase_extensions(frozenset(allowed_extensions))
         file_ext = os.path.splitext(uploaded_file.name)[1].lower()
         if file_ext not in allowed_extensions:
-            errors.append(f"Extension non autorisée. Extensions acceptées: {', '.join(allowed_extensions)}")
+            errors.append(f"Extension non autorisée. Extensions acceptées: {', '.join(sorted(allowed_extensions))}")
     
     # Vérifier la taille
     if max_size and uploaded_file.size > max_size:
@@ -81,144 +162,159 @@ def validate_file_upload(uploaded_file, allowed_extensions=None, max_size=None):
     return errors
 
 
+class SizeLimitedUploadHandler(TemporaryFileUploadHandler):
+    """Écrit l'upload sur disque et l'interrompt dès que MAX_UPLOAD_SIZE est dépassé"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_size = get_flashcroquis_setting('MAX_UPLOAD_SIZE')
+
+    def receive_data_chunk(self, raw_data, start):
+        # start est la position du bloc dans le fichier : pas besoin de compteur
+        if start + len(raw_data) > self.max_size:
+            self.file.close()
+            raise RequestDataTooBig(
+                f"Fichier trop volumineux. Taille max: {self.max_size / (1024*1024):.1f}MB"
+            )
+        return super().receive_data_chunk(raw_data, start)
+
+
+FILE_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+
 def format_file_size(size_bytes):
     """Formater une taille de fichier en format lisible"""
-    if size_bytes == 0:
+    if size_bytes <= 0:
         return "0B"
     
-    size_names = ["B", "KB", "MB", "GB", "TB"]
-    i = 0
-    while size_bytes >= 1024.0 and i < len(size_names) - 1:
-        size_bytes /= 1024.0
-        i += 1
-    
-    return f"{size_bytes:.1f}{size_names[i]}"
+    # Chaque unité vaut 2**10 de la précédente : l'indice se lit sur bit_length
+    # (plancher à 0 pour les tailles fractionnaires inférieures à 1 octet)
+    i = min(max((int(size_bytes).bit_length() - 1) // 10, 0), len(FILE_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (i * 10)):.1f}{FILE_SIZE_UNITS[i]}"
 
 
-def health_check():
-    """Vérification de santé du système"""
-    checks = {}
-    overall_status = True
-    
-    # Vérification de la base de données
+def _check_database():
+    """Vérifier l'accès à la base de données"""
     try:
         from django.db import connection
+        # Vrai aller-retour: ensure_connection() ne fait rien si une connexion
+        # persistante (CONN_MAX_AGE) existe déjà, même si la base est tombée
         with connection.cursor() as cursor:
             cursor.execute("SELECT 1")
-        checks['database'] = {'status': 'ok', 'message': 'Database accessible'}
+        return {'status': 'ok', 'message': 'Database accessible'}, True
     except Exception as e:
-        checks['database'] = {'status': 'error', 'message': str(e)}
-        overall_status = False
-    
-    # Vérification du cache
+        return {'status': 'error', 'message': str(e)}, False
+
+
+def _check_cache():
+    """Vérifier l'accès au cache"""
     try:
         from django.core.cache import cache
         cache.set('health_check', 'ok', 30)
         if cache.get('health_check') == 'ok':
-            checks['cache'] = {'status': 'ok', 'message': 'Cache accessible'}
+            return {'status': 'ok', 'message': 'Cache accessible'}, True
         else:
             raise Exception("Cache test failed")
     except Exception as e:
-        checks['cache'] = {'status': 'error', 'message': str(e)}
-        overall_status = False
-    
-    # Vérification QGIS
+        return {'status': 'error', 'message': str(e)}, False
+
+
+def _check_qgis():
+    """Vérifier l'état de QGIS"""
+    # QGIS est initialisé au démarrage (AppConfig.ready) : cas courant sans appel au manager
+    if _QGIS_READY:
+        return {'status': 'ok', 'message': 'QGIS initialized'}, True
     try:
         from .qgis_utils import get_qgis_manager
         manager = get_qgis_manager()
         if manager.is_initialized():
-            checks['qgis'] = {'status': 'ok', 'message': 'QGIS initialized'}
+            return {'status': 'ok', 'message': 'QGIS initialized'}, True
         else:
-            checks['qgis'] = {'status': 'warning', 'message': 'QGIS not initialized'}
+            return {'status': 'warning', 'message': 'QGIS not initialized'}, True
     except Exception as e:
-        checks['qgis'] = {'status': 'error', 'message': str(e)}
-        overall_status = False
-    
-    # Vérification de l'espace disque
+        return {'status': 'error', 'message': str(e)}, False
+
+
+def _disk_free_bytes(path):
+    """Espace libre sur le volume de path (statvfs direct, sans le namedtuple de shutil)"""
+    if hasattr(os, 'statvfs'):
+        st = os.statvfs(path)
+        return st.f_bavail * st.f_frsize
+    # Windows : pas de statvfs
+    import shutil
+    return shutil.disk_usage(path).free
+
+
+def _check_disk_space():
+    """Vérifier l'espace disque disponible"""
     try:
-        import shutil
-        total, used, free = shutil.disk_usage(settings.MEDIA_ROOT)
-        free_gb = free / (1024**3)
+        free_gb = _disk_free_bytes(settings.MEDIA_ROOT) / (1024**3)
         if free_gb < 1.0:  # Moins de 1GB libre
-            checks['disk_space'] = {'status': 'warning', 'message': f'Low disk space: {free_gb:.2f}GB free'}
-            overall_status = False
+            return {'status': 'warning', 'message': f'Low disk space: {free_gb:.2f}GB free'}, False
         else:
-            checks['disk_space'] = {'status': 'ok', 'message': f'Disk space: {free_gb:.2f}GB free'}
+            return {'status': 'ok', 'message': f'Disk space: {free_gb:.2f}GB free'}, True
     except Exception as e:
-        checks['disk_space'] = {'status': 'error', 'message': str(e)}
-    
-    return {
-        'overall_status': 'healthy' if overall_status else 'unhealthy',
-        'timestamp': datetime.now().isoformat(),
-        'checks': checks
-    }
+        return {'status': 'error', 'message': str(e)}, True
 
 
+# (nom, vérification, TTL propre ou None pour HEALTH_CACHE_TTL)
+HEALTH_CHECKS = (
+    ('database', _check_database, None),
+    ('cache', _check_cache, None),
+    ('qgis', _check_qgis, None),
+    # L'espace disque évolue lentement entre deux sondes
+    ('disk_space', _check_disk_space, 30),
+)
 
+# Vérifications exécutées sur le thread de la requête
+INLINE_HEALTH_CHECKS = frozenset({'database'})
 
+# Pool persistant pour les autres vérifications (pas de création de threads par sonde)
+_health_executor = ThreadPoolExecutor(max_workers=len(HEALTH_CHECKS), thread_name_prefix='health-check')
 
+# Résultats récents par vérification : {nom: (expiration, résultat, sain)}
+_health_cache = {}
+_health_cache_lock = threading.Lock()
 
 
-# Exemple de fichier de migration initial
-MIGRATION_CONTENT = '''
-# Generated migration for FlashCroquis models
+def _cached_check(name, check, ttl=None):
+    """Exécuter une vérification, en réutilisant son résultat pendant ttl secondes (HEALTH_CACHE_TTL par défaut)"""
+    now = time.monotonic()
+    cached = _health_cache.get(name)
+    if cached is not None and cached[0] > now:
+        return cached[1], cached[2]
 
-from django.conf import settings
-from django.db import migrations, models
-import django.db.models.deletion
-import uuid
-
-
-class Migration(migrations.Migration):
-
-    initial = True
-
-    dependencies = [
-        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
-    ]
-
-    operations = [
-        migrations.CreateModel(
-            name='ProjectSession',
-            fields=[
-                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
-                ('title', models.CharField(default='Nouveau Projet', max_length=255)),
-                ('crs', models.CharField(default='EPSG:4326', max_length=50)),
-                ('project_file', models.FileField(blank=True, null=True, upload_to='projects/')),
-                ('status', models.CharField(choices=[('active', 'Active'), ('inactive', 'Inactive'), ('error', 'Error')], default='active', max_length=20)),
-                ('created_at', models.DateTimeField(auto_now_add=True)),
-                ('last_accessed', models.DateTimeField(auto_now=True)),
-                ('metadata', models.JSONField(blank=True, default=dict)),
-                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
-            ],
-            options={
-                'db_table': 'project_sessions',
-                'ordering': ['-last_accessed'],
-            },
-        ),
-        migrations.CreateModel(
-            name='Layer',
-            fields=[
-                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
-                ('qgis_layer_id', models.CharField(max_length=255)),
-                ('name', models.CharField(max_length=255)),
-                ('layer_type', models.CharField(choices=[('vector', 'Vector'), ('raster', 'Raster'), ('unknown', 'Unknown')], max_length=20)),
-                ('geometry_type', models.CharField(blank=True, choices=[('point', 'Point'), ('line', 'Line'), ('polygon', 'Polygon'), ('unknown', 'Unknown')], max_length=20, null=True)),
-                ('source_file', models.FileField(blank=True, null=True, upload_to='layers/')),
-                ('source_url', models.URLField(blank=True, null=True)),
-                ('crs', models.CharField(blank=True, max_length=50, null=True)),
-                ('feature_count', models.IntegerField(default=0)),
-                ('extent', models.JSONField(blank=True, default=dict)),
-                ('is_visible', models.BooleanField(default=True)),
-                ('created_at', models.DateTimeField(auto_now_add=True)),
-                ('updated_at', models.DateTimeField(auto_now=True)),
-                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='layers', to='flashcroquis.projectsession')),
-            ],
-            options={
-                'db_table': 'layers',
-                'ordering': ['created_at'],
-            },
-        ),
-        # ... autres modèles seraient ajoutés ici
-    ]
-'''
\ No newline at end of file
+    result, healthy = check()
+    if ttl is None:
+        ttl = get_flashcroquis_setting('HEALTH_CACHE_TTL', 5)
+    with _health_cache_lock:
+        _health_cache[name] = (now + ttl, result, healthy)
+    return result, healthy
+
+
+def health_check():
+    """Vérification de santé du système"""
+    checks = {}
+    overall_status = True
+
+    # Les sondes (k8s, load balancer) appellent souvent : chaque vérification
+    # est mise en cache quelques secondes pour ne pas saturer DB et cache.
+    # Les vérifications indépendantes tournent en parallèle; la base reste sur
+    # le thread appelant (les connexions Django sont propres à chaque thread)
+    futures = {
+        name: _health_executor.submit(_cached_check, name, check, ttl)
+        for name, check, ttl in HEALTH_CHECKS
+        if name not in INLINE_HEALTH_CHECKS
+    }
+    for name, check, ttl in HEALTH_CHECKS:
+        if name in INLINE_HEALTH_CHECKS:
+            checks[name], healthy = _cached_check(name, check, ttl)
+        else:
+            checks[name], healthy = futures[name].result()
+        overall_status = overall_status and healthy
+    
+    return {
+        'overall_status': 'healthy' if overall_status else 'unhealthy',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'checks': checks
+    }
@@ -9,8 +9,17 @@ from django.conf import settings
 from rest_framework.parsers import MultiPartParser, FormParser
 import os
 import json
+import re
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from .models import ProjectSession, Layer, GeneratedFile
+from .qgis_utils import (
+    get_qgis_classes, initialize_qgis_if_needed,
+    get_project_session,
+    get_project_version, bump_project_version
+)
+from .utils import get_flashcroquis_setting, standard_response_data
 from .serializers import (
     ProjectSessionSerializer, LayerSerializer, GeneratedFileSerializer,
     RenderMapSerializer, AddLayerSerializer, FileUploadSerializer,
@@ -18,209 +27,29 @@ from .serializers import (
 )
 from typing import Dict, Any, Optional, List
 import math
+from functools import lru_cache
+from itertools import islice
+from types import SimpleNamespace
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
 # Configuration du logger
 logger = logging.getLogger(__name__)
 
-# [Code QGISManager et fonctions utilitaires conservé tel quel...]
-# Gestionnaire QGIS
-class QGISManager:
-    def __init__(self):
-        self._initialized = False
-        self._initialization_attempted = False
-        self.qgs_app = None
-        self.classes = {}
-        self.init_errors = []
-        
-    def initialize(self):
-        if self._initialized:
-            return True, None
-            
-        if self._initialization_attempted:
-            return False, self.init_errors
-            
-        self._initialization_attempted = True
-        try:
-            # Configuration de l'environnement QGIS
-            self._setup_qgis_environment()
-            
-            # Importation des classes QGIS
-            from qgis.PyQt.QtCore import Qt
-            from qgis.core import (
-                QgsApplication, QgsProject, QgsVectorLayer, QgsRasterLayer,
-                QgsMapSettings, QgsMapRendererParallelJob, QgsRectangle,
-                QgsProcessingFeedback, QgsProcessingContext, QgsPalLayerSettings,
-                QgsTextFormat, QgsVectorLayerSimpleLabeling, QgsPrintLayout,
-                QgsLayoutItemMap, QgsLayoutItemLegend, QgsLayerTreeModel,
-                QgsLayerTreeLayer, QgsLayerTreeGroup, QgsSingleSymbolRenderer,
-                QgsFillSymbol, QgsLineSymbol, QgsMarkerSymbol, QgsGeometry,
-                QgsFeature, QgsField, QgsVectorFileWriter, QgsWkbTypes, QgsLayoutExporter,
-                QgsLayoutItemScaleBar, QgsLayoutItemPicture, QgsLayoutItemPage,
-                QgsLayoutTable, QgsLayoutItemAttributeTable, QgsUnitTypes, QgsLayoutPoint, QgsLayoutPoint,
-                QgsLayoutSize, QgsLayoutItemLabel
-            )
-            from PyQt5.QtCore import QVariant, QSize, QBuffer, QByteArray, QIODevice
-            from PyQt5.QtGui import QImage, QPainter, QPen, QBrush, QFont, QColor
-            
-            # Initialisation de l'application QGIS
-            self.qgs_app = QgsApplication([], False)
-            self.qgs_app.initQgis()
-            
-            # Stockage des classes
-            self.classes = {
-                'QgsApplication': QgsApplication,
-                'QgsProject': QgsProject,
-                'QgsVectorLayer': QgsVectorLayer,
-                'QgsRasterLayer': QgsRasterLayer,
-                'QgsMapSettings': QgsMapSettings,
-                'QgsMapRendererParallelJob': QgsMapRendererParallelJob,
-                'QgsRectangle': QgsRectangle,
-                'QgsProcessingFeedback': QgsProcessingFeedback,
-                'QgsProcessingContext': QgsProcessingContext,
-                'QgsPalLayerSettings': QgsPalLayerSettings,
-                'QgsTextFormat': QgsTextFormat,
-                'QgsVectorLayerSimpleLabeling': QgsVectorLayerSimpleLabeling,
-                'QgsPrintLayout': QgsPrintLayout,
-                'QgsLayoutItemMap': QgsLayoutItemMap,
-                'QgsLayoutItemLegend': QgsLayoutItemLegend,
-                'QgsLayerTreeModel': QgsLayerTreeModel,
-                'QgsLayerTreeLayer': QgsLayerTreeLayer,
-                'QgsLayerTreeGroup': QgsLayerTreeGroup,
-                'QgsSingleSymbolRenderer': QgsSingleSymbolRenderer,
-                'QgsFillSymbol': QgsFillSymbol,
-                'QgsLineSymbol': QgsLineSymbol,
-                'QgsMarkerSymbol': QgsMarkerSymbol,
-                'QgsGeometry': QgsGeometry,
-                'QgsFeature': QgsFeature,
-                'QgsField': QgsField,
-                'QgsVectorFileWriter': QgsVectorFileWriter,
-                'QgsWkbTypes': QgsWkbTypes,
-                'QVariant': QVariant,
-                'QSize': QSize,
-                'QBuffer': QBuffer,
-                'QByteArray': QByteArray,
-                'QIODevice': QIODevice,
-                'QImage': QImage,
-                'QPainter': QPainter,
-                'QPen': QPen,
-                'QBrush': QBrush,
-                'QFont': QFont,
-                'QColor': QColor,
-                'QgsLayoutExporter': QgsLayoutExporter,
-                'QgsLayoutItemScaleBar': QgsLayoutItemScaleBar,
-                'QgsLayoutItemPicture': QgsLayoutItemPicture,
-                'QgsLayoutItemPage': QgsLayoutItemPage,
-                'QgsLayoutTable': QgsLayoutTable,
-                'QgsLayoutItemAttributeTable': QgsLayoutItemAttributeTable,
-                'QgsUnitTypes': QgsUnitTypes,
-                'QgsLayoutPoint': QgsLayoutPoint,
-                'QgsLayoutSize': QgsLayoutSize,
-                'QgsLayoutFrame': QgsLayoutPoint,
-                'Qt': Qt,
-                'QgsLayoutItemLabel': QgsLayoutItemLabel
-            }
-            
-            self._initialized = True
-            logger.info("Environnement QGIS configuré")
-            return True, None
-            
-        except Exception as e:
-            error_msg = f"Erreur d'initialisation QGIS: {str(e)}"
-            self.init_errors.append(error_msg)
-            logger.error(error_msg)
-            return False, self.init_errors
-
-    def _setup_qgis_environment(self):
-        """Configurer l'environnement QGIS"""
-        os.environ['QT_QPA_PLATFORM'] = 'offscreen'
-        os.environ['QT_DEBUG_PLUGINS'] = '0'
-        os.environ['QT_QPA_FONTDIR'] = os.path.join(os.path.dirname(__file__), 'ttf')
-        os.environ['QT_NO_CPU_FEATURE'] = 'sse4.1,sse4.2,avx,avx2'
-        logger.info("Environnement QGIS configuré")
-
-    def is_initialized(self):
-        return self._initialized
-        
-    def get_classes(self):
-        if not self._initialized:
-            raise Exception("QGIS not initialized")
-        return self.classes
-        
-    def get_errors(self):
-        return self.init_errors
-
-# Singleton pour le gestionnaire QGIS
-def get_qgis_manager():
-    if not hasattr(get_qgis_manager, 'instance'):
-        get_qgis_manager.instance = QGISManager()
-    return get_qgis_manager.instance
-
-def initialize_qgis_if_needed():
-    manager = get_qgis_manager()
-    if not manager.is_initialized():
-        return manager.initialize()
-    return True, None
-
-# Gestion des sessions de projet
-project_sessions = {}
-project_sessions_lock = None  # À implémenter avec threading.Lock() si nécessaire
-
-class ProjectSessionManager:
-    def __init__(self, session_id=None):
-        self.session_id = session_id or str(uuid.uuid4())
-        self.project = None
-        self.created_at = datetime.now()
-        self.last_accessed = datetime.now()
-        self.temporary_files = []
-        
-    def get_project(self, QgsProjectClass):
-        if self.project is None:
-            self.project = QgsProjectClass.instance()
-        return self.project
-
-def get_project_session(session_id=None):
-    """Obtenir ou créer une session de projet"""
-    global project_sessions
-    if project_sessions_lock:
-        with project_sessions_lock:
-            if session_id and session_id in project_sessions:
-                session = project_sessions[session_id]
-            else:
-                session = ProjectSessionManager(session_id)
-                if not session_id:
-                    session_id = session.session_id
-                project_sessions[session_id] = session
-            return session, session_id
-    else:
-        if session_id and session_id in project_sessions:
-            session = project_sessions[session_id]
-        else:
-            session = ProjectSessionManager(session_id)
-            if not session_id:
-                session_id = session.session_id
-            project_sessions[session_id] = session
-        return session, session_id
-
 # Fonctions utilitaires
-def standard_response(success, data=None, message=None, error=None, status_code=200, metadata=None):
-    """Format de réponse standardisé avec métadonnées enrichies"""
-    response_data = {
-        'success': success,
-        'timestamp': datetime.now().isoformat(),
-        'data': data,
-        'message': message,
-        'error': error,
-        'metadata': metadata or {}
-    }
+def standard_response(success, data=None, message=None, error=None, status_code=200, metadata=None, timestamp=None):
+    """Format de réponse standardisé avec métadonnées enrichies
+
+    timestamp permet de réutiliser une date déjà calculée dans la requête.
+    """
+    response_data = standard_response_data(success, data, message, error, metadata, timestamp)
     return Response(response_data, status=status_code)
 
 def handle_exception(e, operation, default_message):
     """Gestion centralisée des exceptions"""
     logger.error(f"Erreur dans {operation}: {str(e)}")
-    import traceback
-    logger.error(traceback.format_exc())
+    # Trace complète en DEBUG seulement: logging ne la formate que si le niveau est actif
+    logger.debug(f"Trace de l'erreur dans {operation}", exc_info=True)
     return standard_response(
         success=False,
         error=str(e),
@@ -255,6 +84,354 @@ def format_layer_info(layer):
             "error": str(e)
         }
 
+# Cache LRU des rendus de carte encodés: {clé: (octets, content_type)}, borné en
+# nombre d'entrées et en octets (render_map accepte jusqu'à 5000x5000 pixels)
+_render_cache = OrderedDict()
+_render_cache_bytes = 0
+_render_cache_lock = threading.Lock()
+
+
+def _render_cache_get(key):
+    """Rendu encodé en cache pour cette clé, ou None"""
+    with _render_cache_lock:
+        entry = _render_cache.get(key)
+        if entry is not None:
+            _render_cache.move_to_end(key)
+        return entry
+
+
+def _render_cache_put(key, entry):
+    """Mémoriser un rendu encodé en évinçant les plus anciens au-delà des limites du cache"""
+    global _render_cache_bytes
+    max_size = get_flashcroquis_setting('RENDER_CACHE_SIZE', 64)
+    max_bytes = get_flashcroquis_setting('RENDER_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+    max_entry_bytes = get_flashcroquis_setting('RENDER_CACHE_MAX_ENTRY_BYTES', 4 * 1024 * 1024)
+    entry_bytes = len(entry[0])
+    if max_size <= 0 or entry_bytes > min(max_entry_bytes, max_bytes):
+        return
+    with _render_cache_lock:
+        previous = _render_cache.pop(key, None)
+        if previous is not None:
+            _render_cache_bytes -= len(previous[0])
+        _render_cache[key] = entry
+        _render_cache_bytes += entry_bytes
+        while len(_render_cache) > max_size or _render_cache_bytes > max_bytes:
+            _, (evicted_content, _) = _render_cache.popitem(last=False)
+            _render_cache_bytes -= len(evicted_content)
+
+
+def _render_map_image(project, width, height, dpi, extent, format_image):
+    """Rendre le projet et renvoyer (octets encodés, content_type)"""
+    C = get_qgis_classes()
+    QgsMapSettings = C.QgsMapSettings
+    QgsMapRendererParallelJob = C.QgsMapRendererParallelJob
+    QgsRectangle = C.QgsRectangle
+    QSize = C.QSize
+
+    # Configuration du rendu
+    map_settings = QgsMapSettings()
+    map_settings.setOutputSize(QSize(width, height))
+    map_settings.setOutputDpi(dpi)
+
+    # Définir le CRS
+    if project.crs().isValid():
+        map_settings.setDestinationCrs(project.crs())
+
+    # Définir l'étendue si fournie
+    if extent:
+        try:
+            coords = [float(x) for x in extent.split(',')]
+            if len(coords) == 4:
+                extent_rect = QgsRectangle(coords[0], coords[1], coords[2], coords[3])
+                map_settings.setExtent(extent_rect)
+        except ValueError:
+            pass  # Ignorer l'étendue invalide
+
+    # Créer le job de rendu
+    job = QgsMapRendererParallelJob(map_settings)
+    job.start()
+
+    # Attendre la fin du rendu
+    job.waitForFinished()
+
+    # Obtenir l'image rendue
+    image = job.renderedImage()
+
+    # Encoder l'image dans un QBuffer (QImage.save attend un QIODevice, pas un BytesIO)
+    byte_array = C.QByteArray()
+    buffer = C.QBuffer(byte_array)
+    buffer.open(C.QIODevice.WriteOnly)
+    if format_image.lower() == 'jpg':
+        image.save(buffer, "JPEG", 90)
+        content_type = 'image/jpeg'
+    else:
+        image.save(buffer, "PNG")
+        content_type = 'image/png'
+    buffer.close()
+    # Libérer l'image brute (largeur*hauteur*4 octets) avant de copier l'encodé
+    del image, job
+    return bytes(byte_array), content_type
+
+
+# Placeholders des étiquettes; en ajouter un = l'ajouter ici et dans placeholder_values
+_PLACEHOLDER_RE = re.compile(r"\[(DATE|SESSION_ID)\]")
+
+
+# SVG de flèche du nord fourni par QGIS (à adapter selon votre installation)
+DEFAULT_NORTH_ARROW_PATH = os.path.join(
+    os.environ.get('QGIS_PREFIX_PATH', '/usr'),
+    'share/qgis/svg/arrows/NorthArrow_02.svg'
+)
+
+
+def _stat_or_none(path):
+    """os.stat(path), ou None si le fichier n'existe pas"""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=32)
+def _read_template_bytes(path, mtime_ns, size):
+    """Contenu d'un template .qpt; mtime et taille font partie de la clé pour invalider le cache"""
+    with open(path, 'rb') as template_file:
+        return template_file.read()
+
+
+# QColor et QFont sont des types valeur Qt: les setters de QGIS en prennent une copie,
+# les instances mises en cache ne doivent donc jamais être modifiées
+@lru_cache(maxsize=256)
+def _make_qcolor(color_hex):
+    """QColor construit une seule fois par code couleur"""
+    return get_qgis_classes().QColor(color_hex)
+
+
+@lru_cache(maxsize=256)
+def _make_qfont(family, size, bold, italic):
+    """QFont construit une seule fois par combinaison police/taille/style"""
+    font = get_qgis_classes().QFont(family, size)
+    font.setBold(bold)
+    font.setItalic(italic)
+    return font
+
+
+# --- Construction des éléments de layout à partir de la configuration ---
+# Chaque constructeur crée, place et configure un élément, ou renvoie None pour l'ignorer;
+# l'ajout au layout, l'enregistrement dans layout_items et la gestion d'erreur sont communs.
+
+def _place_layout_item(item, conf, resize=True):
+    """Positionner (et dimensionner) un élément en millimètres selon x/y/width/height"""
+    C = get_qgis_classes()
+    mm = C.QgsUnitTypes.LayoutMillimeters
+    item.attemptMove(C.QgsLayoutPoint(conf["x"], conf["y"], mm))
+    if resize:
+        item.attemptResize(C.QgsLayoutSize(conf["width"], conf["height"], mm))
+
+
+def _build_map_item(layout, map_conf, ctx):
+    """Carte: couches visibles, étendue, échelle et grille"""
+    C = get_qgis_classes()
+    map_item = C.QgsLayoutItemMap(layout)
+    # Placer avant setExtent/setScale qui dépendent de la taille de l'élément
+    _place_layout_item(map_item, map_conf)
+
+    # a. Couches visibles (sinon, les couches par défaut du projet)
+    layer_ids_to_show = map_conf.get("layers")
+    if layer_ids_to_show:
+        layer_index = ctx.layer_index
+        layers_to_show = [layer_index[lid] for lid in layer_ids_to_show if lid in layer_index]
+        map_item.setLayers(layers_to_show)
+
+    # b. Étendue (sinon, l'étendue par défaut du projet/couches)
+    extent_config = map_conf.get("extent")
+    if extent_config:
+        map_item.setExtent(C.QgsRectangle(
+            extent_config["xmin"], extent_config["ymin"],
+            extent_config["xmax"], extent_config["ymax"]
+        ))
+
+    # c. Échelle
+    scale = map_conf.get("scale")
+    if scale:
+        map_item.setScale(scale)
+
+    # d. Grille
+    grid_config = map_conf.get("grid", {})
+    if grid_config.get("enabled", False):
+        grid = map_item.grid()
+        grid.setEnabled(True)
+        interval = grid_config.get("interval", 100)
+        grid.setIntervalX(interval)
+        grid.setIntervalY(interval)
+
+        grid_color = _make_qcolor(grid_config.get("color", "#888888"))
+        if grid_color.isValid():
+            grid.setGridLineColor(grid_color)
+
+        if grid_config.get("labels", False):
+            grid.setAnnotationEnabled(True)
+            # Position des labels (simplifié): QGIS a des options plus complexes
+
+    # e. Flèche du Nord (image ajoutée au layout juste après la carte, donc au-dessus)
+    north_arrow_config = map_conf.get("north_arrow", {})
+    if north_arrow_config.get("enabled", False):
+        north_arrow_item = _build_north_arrow_item(layout, map_conf, north_arrow_config)
+        if north_arrow_item is not None:
+            ctx.decorations.append(north_arrow_item)
+
+    return map_item
+
+
+def _build_north_arrow_item(layout, map_conf, north_arrow_config):
+    """Flèche du nord en image; coordonnées absolues, par défaut coin haut droit de la carte"""
+    # QGIS fournit des SVG par défaut, mais on peut utiliser un chemin personnalisé
+    arrow_path = north_arrow_config.get("path", DEFAULT_NORTH_ARROW_PATH)
+    if _stat_or_none(arrow_path) is None:
+        logger.warning(f"Chemin de flèche du nord non trouvé: {arrow_path}. Ignorée.")
+        return None
+
+    size = north_arrow_config.get("size", 15)
+    north_arrow_item = get_qgis_classes().QgsLayoutItemPicture(layout)
+    north_arrow_item.setPicturePath(arrow_path)
+    _place_layout_item(north_arrow_item, {
+        "x": north_arrow_config.get("x", map_conf["x"] + map_conf["width"] - 20),
+        "y": north_arrow_config.get("y", map_conf["y"] + 5),
+        "width": size,
+        "height": size,
+    })
+    return north_arrow_item
+
+
+def _build_legend_item(layout, legend_conf, ctx):
+    """Légende, liée à une carte et/ou limitée à certaines couches"""
+    C = get_qgis_classes()
+    legend_item = C.QgsLayoutItemLegend(layout)
+    legend_item.setTitle(legend_conf.get("title", "Légende"))
+    # La taille est souvent gérée automatiquement ou par le frame
+    _place_layout_item(legend_item, legend_conf, resize=False)
+
+    linked_map_id = legend_conf.get("map_id")
+    if linked_map_id and linked_map_id in ctx.layout_items:
+        legend_item.setMap(ctx.layout_items[linked_map_id])
+
+    layer_ids_for_legend = legend_conf.get("layers")
+    if layer_ids_for_legend:
+        # Modèle d'arbre de couches personnalisé (groupe temporaire)
+        root_group = C.QgsLayerTreeGroup()
+        layer_index = ctx.layer_index
+        for lid in layer_ids_for_legend:
+            if lid in layer_index:
+                root_group.addLayer(layer_index[lid])
+        legend_item.model().setRootGroup(root_group)
+        # Important: conserver la référence pour éviter le garbage collection
+        legend_item.custom_group = root_group
+
+    return legend_item
+
+
+# Styles de barre d'échelle acceptés dans la config -> nom du style QGIS
+_SCALEBAR_STYLES = {
+    "numeric": 'Numeric',
+    "double": 'Double Box',
+    "line ticks up": 'Line Ticks Up',
+}
+
+
+def _build_scalebar_item(layout, scale_conf, ctx):
+    """Barre d'échelle liée à une carte déjà créée"""
+    linked_map_id = scale_conf.get("map_id")
+    if not linked_map_id or linked_map_id not in ctx.layout_items:
+        logger.warning(f"Échelle '{scale_conf['id']}' ignorée: carte liée '{linked_map_id}' introuvable.")
+        return None
+
+    scalebar_item = get_qgis_classes().QgsLayoutItemScaleBar(layout)
+    scalebar_item.setLinkedMap(ctx.layout_items[linked_map_id])
+    # La largeur/hauteur est souvent gérée par le style
+    _place_layout_item(scalebar_item, scale_conf, resize=False)
+
+    style = _SCALEBAR_STYLES.get(scale_conf.get("style", "Numeric").lower())
+    if style:
+        scalebar_item.setStyle(style)
+    return scalebar_item
+
+
+def _build_label_item(layout, label_conf, ctx):
+    """Étiquette de texte avec placeholders, police et alignement"""
+    C = get_qgis_classes()
+    Qt = C.Qt
+    label_item = C.QgsLayoutItemLabel(layout)
+    # Remplacement de placeholders (une seule passe)
+    placeholder_values = ctx.placeholder_values
+    label_item.setText(_PLACEHOLDER_RE.sub(lambda m: placeholder_values[m.group(1)], label_conf.get("text", "")))
+    _place_layout_item(label_item, label_conf)
+
+    font_config = label_conf.get("font", {})
+    label_item.setFont(_make_qfont(
+        font_config.get("family", "Arial"),
+        font_config.get("size", 10),
+        bool(font_config.get("bold", False)),
+        bool(font_config.get("italic", False)),
+    ))
+
+    # Alignement (simplifié)
+    alignment = label_conf.get("alignment", "Left").lower()
+    if alignment == "center":
+        label_item.setHAlign(Qt.AlignHCenter)
+    elif alignment == "right":
+        label_item.setHAlign(Qt.AlignRight)
+    else:  # Default/Left
+        label_item.setHAlign(Qt.AlignLeft)
+    return label_item
+
+
+def _build_table_item(layout, table_conf, ctx):
+    """Table attributaire d'une couche vecteur"""
+    layer_id = table_conf.get("layer_id")
+    layer = ctx.layer_index.get(layer_id) if layer_id else None
+    if not layer or not layer.isValid():
+        logger.warning(f"Table '{table_conf['id']}' ignorée: couche '{layer_id}' invalide.")
+        return None
+
+    table_item = get_qgis_classes().QgsLayoutItemAttributeTable.create(layout)
+    table_item.setVectorLayer(layer)
+
+    columns = table_conf.get("columns", [])
+    if columns:
+        # QgsLayoutItemAttributeTable gère les champs via QgsAttributeTableConfig; approche basique
+        table_item.setDisplayedFields(columns)
+
+    table_item.setFeatureLimit(table_conf.get("max_features", 100))
+    table_item.setDisplayOnlyVisibleFeatures(False)  # Afficher tous les features de la couche
+    _place_layout_item(table_item, table_conf)
+    return table_item
+
+
+def _build_picture_item(layout, img_conf, ctx):
+    """Image (logo, cachet...) à partir d'un fichier existant"""
+    image_path = img_conf.get("path")
+    if not image_path or _stat_or_none(image_path) is None:
+        logger.warning(f"Image '{img_conf['id']}' ignorée: chemin invalide '{image_path}'.")
+        return None
+
+    picture_item = get_qgis_classes().QgsLayoutItemPicture(layout)
+    picture_item.setPicturePath(image_path)
+    _place_layout_item(picture_item, img_conf)
+    return picture_item
+
+
+# (section de config, nom pour les logs, article pour les erreurs, constructeur)
+# L'ordre compte: légendes et échelles se lient aux cartes déjà créées.
+_LAYOUT_ITEM_BUILDERS = (
+    ("maps", "Carte", "la carte", _build_map_item),
+    ("legends", "Légende", "la légende", _build_legend_item),
+    ("scales", "Échelle", "l'échelle", _build_scalebar_item),
+    ("labels", "Étiquette", "l'étiquette", _build_label_item),
+    ("tables", "Table", "la table", _build_table_item),
+    ("images", "Image", "l'image", _build_picture_item),
+)
+
+
 def create_administrative_document_layout(
     project,
     session_id: str,
@@ -354,38 +531,19 @@ def create_administrative_document_layout(
         QgsPrintLayout: Le layout créé, ou None en cas d'erreur.
     """
     try:
-        manager = get_qgis_manager() # type: ignore
-        classes = manager.get_classes()
-        QgsPrintLayout = classes['QgsPrintLayout']
-        QgsLayoutItemMap = classes['QgsLayoutItemMap']
-        QgsLayoutItemLegend = classes['QgsLayoutItemLegend']
-        Qt = classes['Qt']
-        QgsLayoutItemScaleBar = classes['QgsLayoutItemScaleBar']
-        QgsLayoutItemPicture = classes['QgsLayoutItemPicture']
-        QgsLayoutItemPage = classes['QgsLayoutItemPage']
-        QgsLayoutTable = classes['QgsLayoutTable']
-        QgsLayoutItemAttributeTable = classes['QgsLayoutItemAttributeTable']
-        QgsUnitTypes = classes['QgsUnitTypes']
-        QgsLayoutPoint = classes['QgsLayoutPoint']
-        QgsLayoutSize = classes['QgsLayoutSize']
-        QgsRectangle = classes['QgsRectangle']
-        QgsLayerTreeModel = classes['QgsLayerTreeModel']
-        QgsLayerTreeLayer = classes['QgsLayerTreeLayer']
-        QgsLayerTreeGroup = classes['QgsLayerTreeGroup']
-        QFont = classes['QFont']
-        QColor = classes['QColor']
-        QgsLayoutFrame = classes['QgsLayoutFrame']
-        QgsLayoutItemLabel = classes['QgsLayoutItemLabel']
+        # Classes liées une fois en variables locales (attributs du namespace mémoïsé)
+        C = get_qgis_classes()
+        QgsPrintLayout = C.QgsPrintLayout
+        QgsLayoutItemPage = C.QgsLayoutItemPage
 
         # --- 1. Initialisation du Layout ---
         layout = QgsPrintLayout(project)
         
-        if template_path and os.path.exists(template_path):
-            # Charger à partir d'un template
-            with open(template_path, 'r') as template_file:
-                template_content = template_file.read()
-            doc = QDomDocument()
-            doc.setContent(template_content)
+        template_stat = _stat_or_none(template_path) if template_path else None
+        if template_stat is not None:
+            # Charger à partir d'un template (contenu mis en cache tant que le fichier ne change pas)
+            doc = C.QDomDocument()
+            doc.setContent(_read_template_bytes(template_path, template_stat.st_mtime_ns, template_stat.st_size))
             layout.loadFromTemplate(doc, project)
             logger.info(f"Layout chargé depuis le template: {template_path}")
         else:
@@ -407,309 +565,37 @@ def create_administrative_document_layout(
         # --- 3. Création d'un dictionnaire des éléments pour référencement croisé ---
         layout_items = {} # {"map1": QgsLayoutItemMap, ...}
 
-        # --- 4. Ajout des Cartes (Maps) ---
-        maps_config = config_data.get("maps", [])
-        for map_conf in maps_config:
-            try:
-                map_id = map_conf["id"]
-                x, y = map_conf["x"], map_conf["y"]
-                width, height = map_conf["width"], map_conf["height"]
-
-                map_item = QgsLayoutItemMap(layout)
-                map_item.attemptMove(QgsLayoutPoint(x, y, QgsUnitTypes.LayoutMillimeters))
-                map_item.attemptResize(QgsLayoutSize(width, height, QgsUnitTypes.LayoutMillimeters))
-
-                # --- Configuration de la Carte ---
-                # a. Couches visibles
-                layer_ids_to_show = map_conf.get("layers")
-                if layer_ids_to_show:
-                    layers_to_show = [project.mapLayer(lid) for lid in layer_ids_to_show if project.mapLayer(lid)]
-                    map_item.setLayers(layers_to_show)
-                # Sinon, il utilise les couches par défaut du projet
-
-                # b. Étendue
-                extent_config = map_conf.get("extent")
-                if extent_config:
-                    extent_rect = QgsRectangle(
-                        extent_config["xmin"], extent_config["ymin"],
-                        extent_config["xmax"], extent_config["ymax"]
-                    )
-                    map_item.setExtent(extent_rect)
-                # Si aucune étendue fournie, l'étendue par défaut du projet/couches sera utilisée
-
-                # c. Échelle
-                scale = map_conf.get("scale")
-                if scale:
-                    map_item.setScale(scale)
-
-                # d. Grille
-                grid_config = map_conf.get("grid", {})
-                if grid_config.get("enabled", False):
-                    grid = map_item.grid()
-                    grid.setEnabled(True)
-                    interval = grid_config.get("interval", 100)
-                    grid.setIntervalX(interval)
-                    grid.setIntervalY(interval)
-                    
-                    grid_color_hex = grid_config.get("color", "#888888")
-                    grid_color = QColor(grid_color_hex)
-                    if grid_color.isValid():
-                        grid.setGridLineColor(grid_color)
-
-                    if grid_config.get("labels", False):
-                        grid.setAnnotationEnabled(True)
-                        # Position des labels (simplifié)
-                        label_pos = grid_config.get("label_position", "all")
-                        # QGIS a des options plus complexes, ici un mapping basique
-                        # ...
-
-                # e. Flèche du Nord
-                north_arrow_config = map_conf.get("north_arrow", {})
-                if north_arrow_config.get("enabled", False):
-                    # La flèche du nord est souvent ajoutée séparément comme une image
-                    # On la stocke dans le config pour l'ajouter plus tard si besoin
-                    pass # Géré dans une passe séparée ou par l'utilisateur
-
-                layout.addLayoutItem(map_item)
-                layout_items[map_id] = map_item
-                logger.debug(f"Carte '{map_id}' ajoutée au layout.")
-
-            except Exception as e:
-                logger.error(f"Erreur lors de l'ajout de la carte {map_conf.get('id', 'unknown')}: {e}")
-
-        # --- 5. Ajout des Légendes ---
-        legends_config = config_data.get("legends", [])
-        for legend_conf in legends_config:
-            try:
-                legend_id = legend_conf["id"]
-                x, y = legend_conf["x"], legend_conf["y"]
-                width, height = legend_conf["width"], legend_conf["height"]
-                title = legend_conf.get("title", "Légende")
-                linked_map_id = legend_conf.get("map_id") # Lier à une carte spécifique
-
-                legend_item = QgsLayoutItemLegend(layout)
-                legend_item.setTitle(title)
-                legend_item.attemptMove(QgsLayoutPoint(x, y, QgsUnitTypes.LayoutMillimeters))
-                # La taille est souvent gérée automatiquement ou par le frame
-                
-                # Lier à une carte si spécifiée
-                if linked_map_id and linked_map_id in layout_items:
-                    linked_map = layout_items[linked_map_id]
-                    legend_item.setMap(linked_map)
-
-                # Gérer les couches spécifiques pour la légende
-                layer_ids_for_legend = legend_conf.get("layers")
-                if layer_ids_for_legend:
-                     # Créer un modèle d'arbre de couches personnalisé
-                    root_group = QgsLayerTreeGroup() # Groupe temporaire
-                    for lid in layer_ids_for_legend:
-                        layer = project.mapLayer(lid)
-                        if layer:
-                            root_group.addLayer(layer)
-                    legend_item.model().setRootGroup(root_group)
-                    # Important: conserver la référence pour éviter le garbage collection
-                    legend_item.custom_group = root_group
-
-                layout.addLayoutItem(legend_item)
-                layout_items[legend_id] = legend_item
-                logger.debug(f"Légende '{legend_id}' ajoutée au layout.")
-
-            except Exception as e:
-                logger.error(f"Erreur lors de l'ajout de la légende {legend_conf.get('id', 'unknown')}: {e}")
-
-        # --- 6. Ajout des Échelles (Scale Bars) ---
-        scales_config = config_data.get("scales", [])
-        for scale_conf in scales_config:
-            try:
-                scale_id = scale_conf["id"]
-                x, y = scale_conf["x"], scale_conf["y"]
-                width, height = scale_conf["width"], scale_conf["height"]
-                linked_map_id = scale_conf.get("map_id")
-                style = scale_conf.get("style", "Numeric") # Par défaut
-
-                if not linked_map_id or linked_map_id not in layout_items:
-                    logger.warning(f"Échelle '{scale_id}' ignorée: carte liée '{linked_map_id}' introuvable.")
-                    continue
-
-                linked_map = layout_items[linked_map_id]
-                
-                scalebar_item = QgsLayoutItemScaleBar(layout)
-                scalebar_item.setLinkedMap(linked_map)
-                scalebar_item.attemptMove(QgsLayoutPoint(x, y, QgsUnitTypes.LayoutMillimeters))
-                # La largeur/hauteur est souvent gérée par le style
-                
-                # Appliquer le style (simplifié)
-                if style.lower() == "numeric":
-                    scalebar_item.setStyle('Numeric')
-                elif style.lower() == "double":
-                    scalebar_item.setStyle('Double Box')
-                elif style.lower() == "line ticks up":
-                    scalebar_item.setStyle('Line Ticks Up')
-                # Ajouter d'autres styles si nécessaire
-
-                layout.addLayoutItem(scalebar_item)
-                layout_items[scale_id] = scalebar_item
-                logger.debug(f"Échelle '{scale_id}' ajoutée au layout.")
-
-            except Exception as e:
-                logger.error(f"Erreur lors de l'ajout de l'échelle {scale_conf.get('id', 'unknown')}: {e}")
-
-        # --- 7. Ajout des Étiquettes (Labels) ---
-        labels_config = config_data.get("labels", [])
-        for label_conf in labels_config:
-            try:
-                label_id = label_conf["id"]
-                x, y = label_conf["x"], label_conf["y"]
-                width, height = label_conf["width"], label_conf["height"]
-                text = label_conf.get("text", "")
-                font_config = label_conf.get("font", {})
-                alignment = label_conf.get("alignment", "Left")
-
-                # Remplacement de placeholders
-                if "[DATE]" in text:
-                    text = text.replace("[DATE]", datetime.now().strftime("%d/%m/%Y"))
-                if "[SESSION_ID]" in text:
-                    text = text.replace("[SESSION_ID]", session_id)
-                # Ajouter d'autres placeholders si nécessaire
-
-                label_item = QgsLayoutItemLabel(layout)
-                label_item.setText(text)
-                label_item.attemptMove(QgsLayoutPoint(x, y, QgsUnitTypes.LayoutMillimeters))
-                label_item.attemptResize(QgsLayoutSize(width, height, QgsUnitTypes.LayoutMillimeters))
-
-                # Configuration de la police
-                font_family = font_config.get("family", "Arial")
-                font_size = font_config.get("size", 10)
-                font_bold = font_config.get("bold", False)
-                font_italic = font_config.get("italic", False)
-                
-                font = QFont(font_family, font_size)
-                font.setBold(font_bold)
-                font.setItalic(font_italic)
-                label_item.setFont(font)
-
-                # Alignement (simplifié)
-                if alignment.lower() == "center":
-                    label_item.setHAlign(Qt.AlignHCenter)
-                elif alignment.lower() == "right":
-                    label_item.setHAlign(Qt.AlignRight)
-                else: # Default/Left
-                    label_item.setHAlign(Qt.AlignLeft)
-
-                layout.addLayoutItem(label_item)
-                layout_items[label_id] = label_item
-                logger.debug(f"Étiquette '{label_id}' ajoutée au layout.")
-
-            except Exception as e:
-                logger.error(f"Erreur lors de l'ajout de l'étiquette {label_conf.get('id', 'unknown')}: {e}")
-
-        # --- 8. Ajout des Tables Attributaires ---
-        tables_config = config_data.get("tables", [])
-        for table_conf in tables_config:
-            try:
-                table_id = table_conf["id"]
-                x, y = table_conf["x"], table_conf["y"]
-                width, height = table_conf["width"], table_conf["height"]
-                layer_id = table_conf.get("layer_id")
-                columns = table_conf.get("columns", [])
-                max_features = table_conf.get("max_features", 100)
-
-                layer = project.mapLayer(layer_id) if layer_id else None
-                if not layer or not layer.isValid():
-                    logger.warning(f"Table '{table_id}' ignorée: couche '{layer_id}' invalide.")
-                    continue
-
-                # Création de la table
-                table_item = QgsLayoutItemAttributeTable.create(layout)
-                table_item.setVectorLayer(layer)
-                
-                # Configuration des colonnes
-                if columns:
-                    # QgsLayoutItemAttributeTable gère les champs via QgsAttributeTableConfig
-                    # Cela peut être complexe, voici une approche basique
-                    table_item.setDisplayedFields(columns)
-                
-                # Limiter le nombre de features
-                table_item.setFeatureLimit(max_features)
-                table_item.setDisplayOnlyVisibleFeatures(False) # Afficher tous les features de la couche
-                
-                # Positionnement et taille
-                table_item.attemptMove(QgsLayoutPoint(x, y, QgsUnitTypes.LayoutMillimeters))
-                table_item.attemptResize(QgsLayoutSize(width, height, QgsUnitTypes.LayoutMillimeters))
-
-                layout.addLayoutItem(table_item)
-                layout_items[table_id] = table_item
-                logger.debug(f"Table '{table_id}' ajoutée au layout.")
-
-            except Exception as e:
-                logger.error(f"Erreur lors de l'ajout de la table {table_conf.get('id', 'unknown')}: {e}")
-
-        # --- 9. Ajout d'Images (e.g., Logo) ---
-        images_config = config_data.get("images", [])
-        for img_conf in images_config:
-            try:
-                img_id = img_conf["id"]
-                x, y = img_conf["x"], img_conf["y"]
-                width, height = img_conf["width"], img_conf["height"]
-                image_path = img_conf.get("path")
-
-                if not image_path or not os.path.exists(image_path):
-                    logger.warning(f"Image '{img_id}' ignorée: chemin invalide '{image_path}'.")
-                    continue
-
-                picture_item = QgsLayoutItemPicture(layout)
-                picture_item.setPicturePath(image_path)
-                picture_item.attemptMove(QgsLayoutPoint(x, y, QgsUnitTypes.LayoutMillimeters))
-                picture_item.attemptResize(QgsLayoutSize(width, height, QgsUnitTypes.LayoutMillimeters))
-
-                layout.addLayoutItem(picture_item)
-                layout_items[img_id] = picture_item
-                logger.debug(f"Image '{img_id}' ajoutée au layout.")
-
-            except Exception as e:
-                logger.error(f"Erreur lors de l'ajout de l'image {img_conf.get('id', 'unknown')}: {e}")
-
-        # --- 10. Ajout de Flèches du Nord (comme éléments Picture) ---
-        # Parcourir à nouveau les cartes pour ajouter les flèches du nord si configurées
-        for map_conf in maps_config:
-            north_arrow_config = map_conf.get("north_arrow", {})
-            if north_arrow_config.get("enabled", False):
+        # --- 4 à 9. Cartes (et flèches du nord), légendes, échelles, étiquettes, tables et images ---
+        build_context = SimpleNamespace(
+            # Index {id: couche} lu une seule fois pour toutes les cartes, légendes et tables
+            layer_index=project.mapLayers(),
+            layout_items=layout_items,
+            # Éléments décoratifs liés à l'élément en cours (flèche du nord...)
+            decorations=[],
+            # Valeurs des placeholders calculées une fois pour toutes les étiquettes
+            placeholder_values={
+                "DATE": datetime.now().strftime("%d/%m/%Y"),
+                "SESSION_ID": session_id,
+            },
+        )
+        for section, item_name, item_ref, builder in _LAYOUT_ITEM_BUILDERS:
+            for item_conf in config_data.get(section, []):
+                build_context.decorations.clear()
                 try:
-                    # Coordonnées de la flèche (relatives à la carte ou absolues)
-                    # Ici, on utilise des coordonnées absolues comme dans la config
-                    x = north_arrow_config.get("x", map_conf["x"] + map_conf["width"] - 20) # Défaut: coin haut droit
-                    y = north_arrow_config.get("y", map_conf["y"] + 5)
-                    size = north_arrow_config.get("size", 15)
-                    
-                    # Chemin vers l'icône de la flèche du nord
-                    # QGIS fournit des SVG par défaut, mais on peut utiliser un chemin personnalisé
-                    # Exemple avec un chemin par défaut (à adapter selon votre installation)
-                    default_north_arrow_path = os.path.join(
-                        os.environ.get('QGIS_PREFIX_PATH', '/usr'), 
-                        'share/qgis/svg/arrows/NorthArrow_02.svg'
-                    )
-                    arrow_path = north_arrow_config.get("path", default_north_arrow_path)
-                    
-                    if not os.path.exists(arrow_path):
-                         # Fallback: créer un triangle simple? Ou ignorer?
-                         logger.warning(f"Chemin de flèche du nord non trouvé: {arrow_path}. Ignorée.")
-                         continue
-
-                    north_arrow_item = QgsLayoutItemPicture(layout)
-                    north_arrow_item.setPicturePath(arrow_path)
-                    north_arrow_item.attemptMove(QgsLayoutPoint(x, y, QgsUnitTypes.LayoutMillimeters))
-                    north_arrow_item.attemptResize(QgsLayoutSize(size, size, QgsUnitTypes.LayoutMillimeters))
-                    
-                    # Optionnel: rotation, frame, etc.
-
-                    layout.addLayoutItem(north_arrow_item)
-                    # Pas besoin de le stocker dans layout_items si c'est purement décoratif
-                    logger.debug(f"Flèche du nord ajoutée pour la carte {map_conf['id']}.")
-
+                    item_id = item_conf["id"]
+                    item = builder(layout, item_conf, build_context)
+                    if item is None:
+                        continue
+                    layout.addLayoutItem(item)
+                    layout_items[item_id] = item
+                    logger.debug(f"{item_name} '{item_id}' ajoutée au layout.")
+                    # Ajoutés après l'élément pour être au-dessus; non référencés dans layout_items
+                    for decoration in build_context.decorations:
+                        layout.addLayoutItem(decoration)
                 except Exception as e:
-                    logger.error(f"Erreur lors de l'ajout de la flèche du nord pour la carte {map_conf.get('id', 'unknown')}: {e}")
+                    logger.error(f"Erreur lors de l'ajout de {item_ref} {item_conf.get('id', 'unknown')}: {e}")
 
-        # --- 11. Rafraîchissement final ---
+        # --- 10. Rafraîchissement final ---
         # Il peut être utile de rafraîchir certains éléments
         for item in layout_items.values():
             if hasattr(item, 'refresh'):
@@ -740,9 +626,8 @@ def export_layout(
         bool: True si l'exportation a réussi, False sinon.
     """
     try:
-        manager = get_qgis_manager() # type: ignore
-        classes = manager.get_classes()
-        QgsLayoutExporter = classes['QgsLayoutExporter']
+        C = get_qgis_classes()
+        QgsLayoutExporter = C.QgsLayoutExporter
 
         exporter = QgsLayoutExporter(layout)
         
@@ -926,13 +811,9 @@ class ProjectSessionViewSet(viewsets.ModelViewSet):
                     status_code=500
                 )
             
-            manager = get_qgis_manager()
-            classes = manager.get_classes()
-            QgsProject = classes['QgsProject']
-            
             # Obtenir la session QGIS
             qgis_session, _ = get_project_session(str(session.session_id))
-            project = qgis_session.get_project(QgsProject)
+            project = qgis_session.get_project()
             
             # Sauvegarder le projet
             if project_path:
@@ -1001,19 +882,12 @@ class ProjectSessionViewSet(viewsets.ModelViewSet):
                     status_code=500
                 )
             
-            # Obtenir les informations du projet
-            manager = get_qgis_manager()
-            classes = manager.get_classes()
-            QgsProject = classes['QgsProject']
-            
             # Obtenir la session QGIS
             qgis_session, _ = get_project_session(str(session.session_id))
-            project = qgis_session.get_project(QgsProject)
+            project = qgis_session.get_project()
             
             # Collecter les informations des couches
-            layers_info = []
-            for layer_id, layer in project.mapLayers().items():
-                layers_info.append(format_layer_info(layer))
+            layers_info = [format_layer_info(layer) for layer in project.mapLayers().values()]
             
             project_info = {
                 "session_id": str(session.session_id),
@@ -1120,14 +994,12 @@ class LayerViewSet(viewsets.ModelViewSet):
                     )
                 
                 # Créer la couche vectorielle
-                manager = get_qgis_manager()
-                classes = manager.get_classes()
-                QgsVectorLayer = classes['QgsVectorLayer']
-                QgsProject = classes['QgsProject']
+                C = get_qgis_classes()
+                QgsVectorLayer = C.QgsVectorLayer
                 
                 # Obtenir la session QGIS
                 qgis_session, _ = get_project_session(str(session_id))
-                project = qgis_session.get_project(QgsProject)
+                project = qgis_session.get_project()
                 
                 # Vérifier si le fichier existe
                 if not os.path.exists(data_source) and not data_source.startswith(('http', 'https')):
@@ -1150,6 +1022,7 @@ class LayerViewSet(viewsets.ModelViewSet):
                 
                 # Ajouter la couche au projet
                 project.addMapLayer(layer)
+                bump_project_version()
                 
                 # Enregistrer dans la base de données
                 db_layer = Layer.objects.create(
@@ -1229,14 +1102,12 @@ class LayerViewSet(viewsets.ModelViewSet):
                     )
                 
                 # Créer la couche raster
-                manager = get_qgis_manager()
-                classes = manager.get_classes()
-                QgsRasterLayer = classes['QgsRasterLayer']
-                QgsProject = classes['QgsProject']
+                C = get_qgis_classes()
+                QgsRasterLayer = C.QgsRasterLayer
                 
                 # Obtenir la session QGIS
                 qgis_session, _ = get_project_session(str(session_id))
-                project = qgis_session.get_project(QgsProject)
+                project = qgis_session.get_project()
                 
                 # Vérifier si le fichier existe
                 if not os.path.exists(data_source) and not data_source.startswith(('http', 'https')):
@@ -1259,6 +1130,7 @@ class LayerViewSet(viewsets.ModelViewSet):
                 
                 # Ajouter la couche au projet
                 project.addMapLayer(layer)
+                bump_project_version()
                 
                 # Enregistrer dans la base de données
                 db_layer = Layer.objects.create(
@@ -1395,14 +1267,9 @@ class LayerViewSet(viewsets.ModelViewSet):
                         status_code=500
                     )
                 
-                # Obtenir la couche QGIS
-                manager = get_qgis_manager()
-                classes = manager.get_classes()
-                QgsProject = classes['QgsProject']
-                
                 # Obtenir la session QGIS
                 qgis_session, _ = get_project_session(str(session_id))
-                project = qgis_session.get_project(QgsProject)
+                project = qgis_session.get_project()
                 
                 # Obtenir la couche
                 qgis_layer = project.mapLayer(str(layer_id))
@@ -1414,22 +1281,19 @@ class LayerViewSet(viewsets.ModelViewSet):
                         status_code=404
                     )
                 
-                # Récupérer les features
+                # Récupérer les features: la limite est transmise au fournisseur (LIMIT côté
+                # OGR/PostGIS), les `offset` premières sont sautées sans être converties
                 features_data = []
-                feature_iterator = qgis_layer.getFeatures()
-                feature_iterator.setLimit(limit)
-                feature_iterator.setOffset(offset)
+                feature_request = get_qgis_classes().QgsFeatureRequest()
+                feature_request.setLimit(offset + limit)
+                feature_iterator = islice(qgis_layer.getFeatures(feature_request), offset, None)
+                
+                # Noms des champs lus une fois pour la couche, pas pour chaque feature
+                field_names = [field.name() for field in qgis_layer.fields()]
                 
                 for feature in feature_iterator:
-                    # Récupérer les attributs
-                    attrs = feature.attributes()
-                    fields = feature.fields()
-                    
                     # Convertir les attributs en dictionnaire
-                    feature_data = {}
-                    for i, attr in enumerate(attrs):
-                        field_name = fields[i].name()
-                        feature_data[field_name] = attr
+                    feature_data = dict(zip(field_names, feature.attributes()))
                     
                     # Ajouter la géométrie si disponible
                     geometry = feature.geometry()
@@ -1550,14 +1414,9 @@ class LayerViewSet(viewsets.ModelViewSet):
                     status_code=500
                 )
             
-            # Obtenir l'étendue de la couche
-            manager = get_qgis_manager()
-            classes = manager.get_classes()
-            QgsProject = classes['QgsProject']
-            
             # Obtenir la session QGIS
             qgis_session, _ = get_project_session(str(session_id))
-            project = qgis_session.get_project(QgsProject)
+            project = qgis_session.get_project()
             
             # Obtenir la couche
             qgis_layer = project.mapLayer(str(id))
@@ -1658,16 +1517,13 @@ class LayerViewSet(viewsets.ModelViewSet):
                     status_code=500
                 )
             
-            manager = get_qgis_manager()
-            classes = manager.get_classes()
-            QgsProject = classes['QgsProject']
-            
             # Obtenir la session QGIS
             qgis_session, _ = get_project_session(str(session_id))
-            project = qgis_session.get_project(QgsProject)
+            project = qgis_session.get_project()
             
             # Supprimer la couche du projet
             project.removeMapLayer(str(id))
+            bump_project_version()
             
             # Supprimer de la base de données
             layer.delete()
@@ -1836,66 +1692,20 @@ class MapViewSet(viewsets.ViewSet):
                         status_code=500
                     )
                 
-                # Créer les paramètres de carte
-                manager = get_qgis_manager()
-                classes = manager.get_classes()
-                QgsProject = classes['QgsProject']
-                QgsMapSettings = classes['QgsMapSettings']
-                QgsMapRendererParallelJob = classes['QgsMapRendererParallelJob']
-                QgsRectangle = classes['QgsRectangle']
-                QSize = classes['QSize']
-                QImage = classes['QImage']
-                QPainter = classes['QPainter']
-                QPen = classes['QPen']
-                QBrush = classes['QBrush']
-                QColor = classes['QColor']
-                QFont = classes['QFont']
-                
                 # Obtenir la session QGIS
                 qgis_session, _ = get_project_session(str(session_id))
-                project = qgis_session.get_project(QgsProject)
-                
-                # Configuration du rendu
-                map_settings = QgsMapSettings()
-                map_settings.setOutputSize(QSize(width, height))
-                map_settings.setOutputDpi(dpi)
+                project = qgis_session.get_project()
                 
-                # Définir le CRS
-                if project.crs().isValid():
-                    map_settings.setDestinationCrs(project.crs())
-                
-                # Définir l'étendue si fournie
-                if extent:
-                    try:
-                        coords = [float(x) for x in extent.split(',')]
-                        if len(coords) == 4:
-                            extent_rect = QgsRectangle(coords[0], coords[1], coords[2], coords[3])
-                            map_settings.setExtent(extent_rect)
-                    except ValueError:
-                        pass  # Ignorer l'étendue invalide
-                
-                # Créer le job de rendu
-                job = QgsMapRendererParallelJob(map_settings)
-                job.start()
-                
-                # Attendre la fin du rendu
-                job.waitForFinished()
-                
-                # Obtenir l'image rendue
-                image = job.renderedImage()
-                
-                # Convertir l'image en bytes
-                from io import BytesIO
-                buffer = BytesIO()
-                if format_image.lower() == 'jpg':
-                    image.save(buffer, "JPEG", quality=90)
-                    content_type = 'image/jpeg'
-                else:
-                    image.save(buffer, "PNG")
-                    content_type = 'image/png'
+                # Rendu en cache tant que les couches du projet et les paramètres ne changent pas
+                cache_key = (get_project_version(), tuple(sorted(serializer.validated_data.items())))
+                cached = _render_cache_get(cache_key)
+                if cached is None:
+                    cached = _render_map_image(project, width, height, dpi, extent, format_image)
+                    _render_cache_put(cache_key, cached)
+                content, content_type = cached
                 
                 # Créer la réponse HTTP
-                response = HttpResponse(buffer.getvalue(), content_type=content_type)
+                response = HttpResponse(content, content_type=content_type)
                 response['Content-Disposition'] = f'inline; filename="map_render.{format_image.lower()}"'
                 return response
                 
@@ -2012,18 +1822,16 @@ class MapViewSet(viewsets.ViewSet):
                     )
                 
                 # Traiter la parcelle avec QGIS
-                manager = get_qgis_manager()
-                classes = manager.get_classes()
-                QgsProject = classes['QgsProject']
-                QgsVectorLayer = classes['QgsVectorLayer']
-                QgsGeometry = classes['QgsGeometry']
-                QgsFeature = classes['QgsFeature']
-                QgsField = classes['QgsField']
-                QVariant = classes['QVariant']
+                C = get_qgis_classes()
+                QgsVectorLayer = C.QgsVectorLayer
+                QgsGeometry = C.QgsGeometry
+                QgsFeature = C.QgsFeature
+                QgsField = C.QgsField
+                QVariant = C.QVariant
                 
                 # Obtenir la session QGIS
                 qgis_session, _ = get_project_session(str(session_id))
-                project = qgis_session.get_project(QgsProject)
+                project = qgis_session.get_project()
                 
                 # Créer le polygone
                 if len(points) < 3:
@@ -2064,6 +1872,7 @@ class MapViewSet(viewsets.ViewSet):
                 
                 # Ajouter au projet
                 project.addMapLayer(polygon_layer)
+                bump_project_version()
                 
                 # Calculer les résultats
                 area_m2 = polygon_geom.area()
@@ -2270,32 +2079,14 @@ class MapViewSet(viewsets.ViewSet):
                     )
                 
                 # Générer le croquis avec QGIS
-                manager = get_qgis_manager()
-                classes = manager.get_classes()
-                QgsProject = classes['QgsProject']
-                QgsLayoutExporter = classes['QgsLayoutExporter'] 
+                C = get_qgis_classes()
+                QgsLayoutExporter = C.QgsLayoutExporter 
                 
-                if project_sessions_lock:
-                    with project_sessions_lock:
-                        session_qgis = project_sessions.get(str(session_id))
-                        if session_qgis is None:
-                             return standard_response(
-                                success=False,
-                                error="QGIS Session not found",
-                                message="Session QGIS non trouvée. Veuillez créer une nouvelle session.",
-                                status_code=404
-                            )
-                else:
-                     session_qgis = project_sessions.get(str(session_id))
-                     if session_qgis is None:
-                         return standard_response(
-                            success=False,
-                            error="QGIS Session not found",
-                            message="Session QGIS non trouvée. Veuillez créer une nouvelle session.",
-                            status_code=404
-                        )
+                # Comme les autres vues: recrée l'entrée si elle a été évincée du registre
+                # (la session existe en base) et rafraîchit last_accessed
+                session_qgis, _ = get_project_session(str(session_id))
 
-                project = session_qgis.get_project(QgsProject)
+                project = session_qgis.get_project()
                 
                 template_path = None
                 if template_id:
@@ -2455,6 +2246,8 @@ class FileViewSet(viewsets.ViewSet):
             custom_name = serializer.validated_data.get('custom_name')
             file_type = serializer.validated_data.get('file_type', 'unknown')
             
+            # Date de la requête: répertoire daté et horodatage de la réponse
+            now = datetime.now()
             try:
                 # 1. Déterminer le nom du fichier
                 if custom_name:
@@ -2473,8 +2266,7 @@ class FileViewSet(viewsets.ViewSet):
                     upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads', str(session_id))
                 else:
                     # Exemple: media/uploads/<date>/<filename>
-                    from datetime import datetime
-                    today_str = datetime.now().strftime('%Y/%m/%d')
+                    today_str = now.strftime('%Y/%m/%d')
                     upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads', today_str)
                 
                 os.makedirs(upload_dir, exist_ok=True) # Crée les répertoires si nécessaire
@@ -2522,14 +2314,16 @@ class FileViewSet(viewsets.ViewSet):
                         'content_type': uploaded_file.content_type,
                         # 'db_id': generated_file_db.id if 'generated_file_db' in locals() else None
                     },
-                    message="Fichier téléchargé avec succès"
+                    message="Fichier téléchargé avec succès",
+                    timestamp=now
                 )
             except ProjectSession.DoesNotExist:
                 return standard_response(
                     success=False,
                     error="Session not found",
                     message="Session spécifiée non trouvée",
-                    status_code=status.HTTP_400_BAD_REQUEST # 400 car l'ID était fourni mais invalide
+                    status_code=status.HTTP_400_BAD_REQUEST, # 400 car l'ID était fourni mais invalide
+                    timestamp=now
                 )
             except Exception as e:
                  return handle_exception(e, "upload_file", "Erreur lors du téléchargement du fichier")
@@ -2715,21 +2509,22 @@ class FileViewSet(viewsets.ViewSet):
         try:
             generated_file = GeneratedFile.objects.get(id=pk)
             
-            # Vérifier si le fichier existe
-            if os.path.exists(generated_file.file_path):
-                response = FileResponse(
-                    open(generated_file.file_path, 'rb'),
-                    as_attachment=True,
-                    filename=os.path.basename(generated_file.file_path)
-                )
-                return response
-            else:
+            # Ouvrir directement: FileResponse transmet le fichier par blocs
+            # (ou via wsgi.file_wrapper/sendfile) sans le charger en mémoire
+            try:
+                file_handle = open(generated_file.file_path, 'rb')
+            except FileNotFoundError:
                 return standard_response(
                     success=False,
                     error="File not found",
                     message="Fichier non trouvé",
                     status_code=404
                 )
+            return FileResponse(
+                file_handle,
+                as_attachment=True,
+                filename=os.path.basename(generated_file.file_path)
+            )
         except GeneratedFile.DoesNotExist:
             return standard_response(
                 success=False,
@@ -2739,6 +2534,3 @@ class FileViewSet(viewsets.ViewSet):
             )
         except Exception as e:
             return handle_exception(e, "download_file", "Impossible de télécharger le fichier")
-
-
-initialize_qgis_if_needed()
\ No newline at end of file